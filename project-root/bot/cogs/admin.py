@@ -4,7 +4,24 @@ from dotenv import load_dotenv
 import os
 
 from utils.config_utils import load_config
-from utils.database_utils import get_server_settings, update_server_settings
+from utils.database_utils import (
+    get_server_settings,
+    update_server_settings,
+    get_playlist_names,
+    create_playlist,
+    add_to_playlist,
+    remove_from_playlist,
+    delete_playlist,
+)
+from utils.monitor_utils import loop_monitor
+from utils.audio_utils import get_buffer_stats
+
+PLAYLIST_PAGE_SIZE = 20
+# Long enough to tell playlists apart, short enough that a full page fits in one message.
+MAX_NAME_LENGTH = 80
+
+# Reply for settings commands when the database is unreachable.
+SETTINGS_UNAVAILABLE_MESSAGE = "Server settings are unavailable right now. Please try again later."
 
 
 class AdminCog(commands.Cog):
@@ -12,11 +29,17 @@ class AdminCog(commands.Cog):
         self.bot = bot
         load_dotenv()
         self.config = load_config()
+        # Per-guild rendered playlist pages, and the name each page ends on for cursor paging.
+        self.playlist_pages = {}
+        self.playlist_cursors = {}
 
     @commands.command(name="setprefix", help="Sets the command prefix for the server.")
     @commands.has_permissions(administrator=True)
     async def set_prefix(self, ctx, prefix):
         server_settings = get_server_settings(ctx.guild.id)
+        if server_settings is None:
+            await ctx.send(SETTINGS_UNAVAILABLE_MESSAGE)
+            return
         server_settings['DEFAULT_PREFIX'] = prefix
         update_server_settings(ctx.guild.id, server_settings)
         await ctx.send(f"Command prefix set to `{prefix}`.")
@@ -30,6 +53,9 @@ class AdminCog(commands.Cog):
             return
 
         server_settings = get_server_settings(ctx.guild.id)
+        if server_settings is None:
+            await ctx.send(SETTINGS_UNAVAILABLE_MESSAGE)
+            return
         server_settings['DEFAULT_SOURCE'] = source.lower()
         update_server_settings(ctx.guild.id, server_settings)
         await ctx.send(f"Default music source set to `{source}`.")
@@ -43,6 +69,9 @@ class AdminCog(commands.Cog):
             return
 
         server_settings = get_server_settings(ctx.guild.id)
+        if server_settings is None:
+            await ctx.send(SETTINGS_UNAVAILABLE_MESSAGE)
+            return
         if source.lower() in server_settings['ALLOWED_SOURCES']:
             await ctx.send(f"Music source `{source}` is already allowed.")
             return
@@ -60,6 +89,9 @@ class AdminCog(commands.Cog):
             return
 
         server_settings = get_server_settings(ctx.guild.id)
+        if server_settings is None:
+            await ctx.send(SETTINGS_UNAVAILABLE_MESSAGE)
+            return
         if source.lower() not in server_settings['ALLOWED_SOURCES']:
             await ctx.send(f"Music source `{source}` is not allowed.")
             return
@@ -68,21 +100,68 @@ class AdminCog(commands.Cog):
         update_server_settings(ctx.guild.id, server_settings)
         await ctx.send(f"Music source `{source}` removed.")
 
-    @commands.command(name="viewplaylists", help="Displays all available playlists.")
+    @commands.command(name="viewplaylists", help="Displays a page of available playlists.")
     @commands.has_permissions(administrator=True)
-    async def view_playlists(self, ctx):
-        playlists = get_playlists(ctx.guild.id)
-        if not playlists:
-            await ctx.send("No playlists found.")
+    async def view_playlists(self, ctx, page: int = 1):
+        if page < 1:
+            await ctx.send("Page must be 1 or greater.")
             return
 
-        playlist_names = [playlist['name'] for playlist in playlists]
-        await ctx.send(f"Available playlists: {', '.join(playlist_names)}")
+        pages = self.playlist_pages.setdefault(ctx.guild.id, {})
+        if page not in pages:
+            message = self.render_playlist_page(ctx.guild.id, page)
+            if message is None:
+                await ctx.send("No playlists found.")
+                return
+            pages[page] = message
+        await ctx.send(pages[page])
+
+    def render_playlist_page(self, server_id, page):
+        """Renders one page of playlist names, fetching only the rows it needs.
+
+        Pages are fetched with the previous page's last name as a cursor. Cursors
+        of pages already visited are remembered, so jumping back or one page
+        ahead is a single query.
+
+        Args:
+            server_id (int): The ID of the Discord server.
+            page (int): The 1-based page number to render.
+
+        Returns:
+            str: The page as a Discord message, or None if the page is empty.
+        """
+        cursors = self.playlist_cursors.setdefault(server_id, {1: None})
+        known = max(p for p in cursors if p <= page)
+        names = None
+        for current in range(known, page + 1):
+            # Fetch one extra row to learn whether another page follows.
+            names = get_playlist_names(server_id, after=cursors[current], limit=PLAYLIST_PAGE_SIZE + 1)
+            if not names:
+                return None
+            if len(names) > PLAYLIST_PAGE_SIZE:
+                cursors[current + 1] = names[PLAYLIST_PAGE_SIZE - 1]
+            elif current < page:
+                return None
+
+        has_next = len(names) > PLAYLIST_PAGE_SIZE
+        message = f"Available playlists: {', '.join(name[:MAX_NAME_LENGTH] for name in names[:PLAYLIST_PAGE_SIZE])}"
+        if has_next or page > 1:
+            message += f" (page {page}"
+            if has_next:
+                message += f", use `viewplaylists {page + 1}` for more"
+            message += ")"
+        return message
+
+    def invalidate_playlist_pages(self, server_id):
+        """Drops cached playlist pages and cursors after a playlist is added or removed."""
+        self.playlist_pages.pop(server_id, None)
+        self.playlist_cursors.pop(server_id, None)
 
     @commands.command(name="createplaylist", help="Creates a new playlist.")
     @commands.has_permissions(administrator=True)
     async def create_playlist(self, ctx, name):
         create_playlist(ctx.guild.id, name)
+        self.invalidate_playlist_pages(ctx.guild.id)
         await ctx.send(f"Playlist `{name}` created.")
 
     @commands.command(name="addtoplaylist", help="Adds a song to a playlist.")
@@ -101,8 +180,34 @@ class AdminCog(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def delete_playlist(self, ctx, name):
         delete_playlist(ctx.guild.id, name)
+        self.invalidate_playlist_pages(ctx.guild.id)
         await ctx.send(f"Playlist `{name}` deleted.")
 
+    @commands.command(name="loopstats", help="Shows event loop lag and recent stalls.")
+    @commands.is_owner()
+    async def loop_stats(self, ctx):
+        stats = loop_monitor.get_stats()
+        lines = [
+            f"Loop lag over {stats['samples']} samples: p50 {stats['p50'] * 1000:.1f} ms, "
+            f"p99 {stats['p99'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms"
+        ]
+        buffer_stats = get_buffer_stats()
+        if buffer_stats['frames']:
+            lines.append(
+                f"Audio buffer underruns: {buffer_stats['underruns']} in {buffer_stats['frames']} frames "
+                f"({buffer_stats['underruns'] / buffer_stats['frames']:.2%})"
+            )
+        stalls = list(loop_monitor.stalls)[-5:]
+        if stalls:
+            lines.append("Recent stalls:")
+            for stall in reversed(stalls):
+                lines.append(
+                    f"{stall['duration'] * 1000:.0f} ms in {stall['command'] or 'no command'} at {stall['location']}"
+                )
+        else:
+            lines.append("No stalls recorded.")
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
 
 def setup(bot):
     bot.add_cog(AdminCog(bot))
\ No newline at end of file
@@ -1,10 +1,23 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import youtube_dl
 import asyncio
-from utils.music_utils import get_song_info, get_audio_stream, play_audio, stop_audio
+import logging
+import time
+from utils.music_utils import get_song_info, get_audio_stream, get_broadcast, play_audio, stop_audio
+from utils.audio_utils import BufferedPCMAudio
+from utils.database_utils import get_track_loudness, get_top_tracks
+from utils.history_utils import PlayHistoryWriter
+from utils.cache_utils import warm_song_info_cache
+from utils.loudness_utils import LoudnessAnalyzer, get_normalization_gain
+from utils.player_utils import GuildPlayer, serialized
+from utils.config_utils import get_config
+from utils.error_handling import handle_error
 import os
 
+config = get_config()
+logger = logging.getLogger(__name__)
+
 ytdl_opts = {
     'format': 'bestaudio/best',
     'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s',
@@ -18,39 +31,68 @@ ytdl_opts = {
     'source_address': '0.0.0.0'
 }
 
+QUEUE_PAGE_SIZE = 10
+MAX_TITLE_LENGTH = 80
+
 ffmpeg_options = {
-    'options': '-vn -af "volume=1" -loglevel quiet',
+    'options': '-vn -loglevel quiet',
     'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
 }
 
 class MusicCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.queue = []
-        self.current_song = None
-        self.voice_client = None
-        self.song_loop = False
+        self.players = {}
+        self.loudness_analyzer = LoudnessAnalyzer()
+        self.history_writer = PlayHistoryWriter()
+
+    async def cog_load(self):
+        self.reap_idle_players.start()
+        self.warm_caches.start()
+
+    async def cog_unload(self):
+        self.reap_idle_players.cancel()
+        self.warm_caches.cancel()
+        self.loudness_analyzer.close()
+        for player in self.players.values():
+            player.close()
+        await self.history_writer.close()
+
+    def get_player(self, guild_id):
+        """Returns the guild's player, creating it on first use."""
+        if guild_id not in self.players:
+            self.players[guild_id] = GuildPlayer(guild_id)
+        return self.players[guild_id]
 
     @commands.command(name='join', help='Joins the voice channel you are in.')
+    @serialized
     async def join(self, ctx):
         if not ctx.author.voice:
             await ctx.send("You are not connected to a voice channel.")
             return
 
+        await self.connect(ctx, self.get_player(ctx.guild.id))
+
+    async def connect(self, ctx, player):
         channel = ctx.author.voice.channel
-        if self.voice_client:
-            await self.voice_client.disconnect()
+        if player.voice_client:
+            await player.voice_client.disconnect()
 
-        self.voice_client = await channel.connect()
+        player.voice_client = await channel.connect()
 
         await ctx.send(f'Joined {channel.name}')
 
     @commands.command(name='leave', help='Leaves the voice channel.')
+    @serialized
     async def leave(self, ctx):
-        if self.voice_client:
-            await self.voice_client.disconnect()
-            self.queue = []
-            self.current_song = None
+        player = self.get_player(ctx.guild.id)
+        if player.voice_client:
+            await player.voice_client.disconnect()
+            player.voice_client = None
+            player.queue = []
+            player.queue_pages.clear()
+            player.current_song = None
+            player.current_source = None
             await ctx.send("Disconnected from voice channel.")
         else:
             await ctx.send("I am not in a voice channel.")
@@ -61,124 +103,415 @@ class MusicCog(commands.Cog):
             await ctx.send("You are not connected to a voice channel.")
             return
 
-        if self.voice_client is None:
-            await self.join(ctx)
-
         if url is None:
             await ctx.send("Please provide a valid URL or file path.")
             return
 
+        # Resolve outside the mailbox so a slow extractor doesn't hold up the guild's other commands.
         try:
             song_info = await get_song_info(url)
         except youtube_dl.utils.DownloadError:
             await ctx.send(f"Error: Invalid URL or file path. Please try again.")
             return
 
-        self.queue.append(song_info)
+        await self.get_player(ctx.guild.id).submit(self.enqueue, ctx, song_info)
+
+    async def enqueue(self, ctx, song_info):
+        player = self.get_player(ctx.guild.id)
+        player.ctx = ctx
+        if player.voice_client is None:
+            await self.connect(ctx, player)
+
+        player.queue.append(song_info)
+        player.queue_pages.clear()
 
-        if self.current_song is None:
-            await self.play_next(ctx)
+        if player.current_song is None:
+            await self.play_next(ctx, player)
 
         await ctx.send(f"Added {song_info['title']} to the queue.")
 
     @commands.command(name='pause', help='Pauses the current song.')
+    @serialized
     async def pause(self, ctx):
-        if self.voice_client and self.voice_client.is_playing():
-            self.voice_client.pause()
+        player = self.get_player(ctx.guild.id)
+        if player.voice_client and player.voice_client.is_playing():
+            player.voice_client.pause()
             await ctx.send("Paused.")
         else:
             await ctx.send("No song is playing.")
 
     @commands.command(name='resume', help='Resumes the current song.')
+    @serialized
     async def resume(self, ctx):
-        if self.voice_client and self.voice_client.is_paused():
-            self.voice_client.resume()
+        player = self.get_player(ctx.guild.id)
+        if player.voice_client and player.voice_client.is_paused():
+            player.voice_client.resume()
             await ctx.send("Resumed.")
         else:
             await ctx.send("No song is paused.")
 
     @commands.command(name='stop', help='Stops the current song and clears the queue.')
+    @serialized
     async def stop(self, ctx):
-        if self.voice_client:
-            self.voice_client.stop()
-            self.queue = []
-            self.current_song = None
+        player = self.get_player(ctx.guild.id)
+        if player.voice_client:
+            player.queue = []
+            player.queue_pages.clear()
+            player.current_song = None
+            player.current_source = None
+            player.voice_client.stop()
             await ctx.send("Stopped.")
         else:
             await ctx.send("I am not in a voice channel.")
 
     @commands.command(name='skip', help='Skips the current song.')
+    @serialized
     async def skip(self, ctx):
-        if self.voice_client and self.voice_client.is_playing():
-            self.voice_client.stop()
-            await self.play_next(ctx)
+        player = self.get_player(ctx.guild.id)
+        if player.voice_client and player.voice_client.is_playing():
+            # Forget the song first so a looping player doesn't queue it again, then let
+            # the `after` callback fired by stopping advance the queue exactly once.
+            player.current_song = None
+            player.voice_client.stop()
             await ctx.send("Skipped.")
         else:
             await ctx.send("No song is playing.")
 
-    @commands.command(name='queue', help='Shows the current music queue.')
-    async def queue(self, ctx):
-        if len(self.queue) == 0:
+    @commands.command(name='queue', help='Shows a page of the current music queue.')
+    async def queue(self, ctx, page: int = 1):
+        player = self.get_player(ctx.guild.id)
+        if len(player.queue) == 0:
             await ctx.send("The queue is empty.")
             return
 
-        queue_str = "```\n"
-        for i, song in enumerate(self.queue):
-            queue_str += f"{i+1}. {song['title']}\n"
-        queue_str += "```"
-        await ctx.send(queue_str)
+        pages = (len(player.queue) + QUEUE_PAGE_SIZE - 1) // QUEUE_PAGE_SIZE
+        if not 1 <= page <= pages:
+            await ctx.send(f"Page must be between 1 and {pages}.")
+            return
+
+        if page not in player.queue_pages:
+            player.queue_pages[page] = self.render_queue_page(player, page, pages)
+        await ctx.send(player.queue_pages[page])
+
+    def render_queue_page(self, player, page, pages):
+        """Renders one page of the queue, touching only that page's songs.
+
+        Args:
+            player (GuildPlayer): The guild's player.
+            page (int): The 1-based page number to render.
+            pages (int): The total number of pages.
+
+        Returns:
+            str: The page as a Discord message.
+        """
+        start = (page - 1) * QUEUE_PAGE_SIZE
+        lines = [
+            f"{i}. {song['title'][:MAX_TITLE_LENGTH]}"
+            for i, song in enumerate(player.queue[start:start + QUEUE_PAGE_SIZE], start=start + 1)
+        ]
+        if pages > 1:
+            lines.append(f"Page {page}/{pages}")
+        return "```\n" + "\n".join(lines) + "\n```"
 
     @commands.command(name='clear', help='Clears the current music queue.')
+    @serialized
     async def clear(self, ctx):
-        if self.voice_client:
-            self.voice_client.stop()
-            self.queue = []
-            self.current_song = None
+        player = self.get_player(ctx.guild.id)
+        if player.voice_client:
+            player.queue = []
+            player.queue_pages.clear()
+            player.current_song = None
+            player.current_source = None
+            player.voice_client.stop()
             await ctx.send("Cleared the queue.")
         else:
             await ctx.send("I am not in a voice channel.")
 
     @commands.command(name='volume', help='Sets the playback volume. (0-100)')
+    @serialized
     async def volume(self, ctx, volume: int):
-        if not self.voice_client:
+        player = self.get_player(ctx.guild.id)
+        if not player.voice_client:
             await ctx.send("I am not in a voice channel.")
             return
 
+        source = player.voice_client.source
+        if source is not None and not isinstance(source, BufferedPCMAudio):
+            await ctx.send("Volume cannot be changed during a broadcast.")
+            return
+
         if 0 <= volume <= 100:
-            self.voice_client.source.volume = volume / 100
+            player.volume_level = volume / 100
+            if source is not None:
+                source.volume = player.volume_level
             await ctx.send(f"Volume set to {volume}%")
         else:
             await ctx.send("Volume must be between 0 and 100.")
 
+    @commands.command(name='fade', help='Fades the playback volume over a number of seconds. (0-100)')
+    @serialized
+    async def fade(self, ctx, volume: int, seconds: float):
+        player = self.get_player(ctx.guild.id)
+        if not player.voice_client or not player.voice_client.source:
+            await ctx.send("No song is playing.")
+            return
+
+        if not isinstance(player.voice_client.source, BufferedPCMAudio):
+            await ctx.send("Volume cannot be changed during a broadcast.")
+            return
+
+        if not 0 <= volume <= 100:
+            await ctx.send("Volume must be between 0 and 100.")
+            return
+
+        if seconds <= 0:
+            await ctx.send("Fade duration must be positive.")
+            return
+
+        player.volume_level = volume / 100
+        player.voice_client.source.filter.fade(player.volume_level, seconds)
+        await ctx.send(f"Fading volume to {volume}% over {seconds:g} seconds.")
+
     @commands.command(name='loop', help='Loops the current song. (on/off)')
+    @serialized
     async def loop(self, ctx, loop_mode):
+        player = self.get_player(ctx.guild.id)
         if loop_mode.lower() == 'on':
-            self.song_loop = True
+            player.song_loop = True
             await ctx.send("Song loop enabled.")
         elif loop_mode.lower() == 'off':
-            self.song_loop = False
+            player.song_loop = False
             await ctx.send("Song loop disabled.")
         else:
             await ctx.send("Invalid loop mode. Use 'on' or 'off'.")
 
-    async def play_next(self, ctx):
-        if len(self.queue) > 0:
-            self.current_song = self.queue.pop(0)
+    @commands.command(name='toptracks', help='Shows the most played songs on this server.')
+    async def top_tracks(self, ctx):
+        tracks = await asyncio.get_running_loop().run_in_executor(None, get_top_tracks, ctx.guild.id)
+        if not tracks:
+            await ctx.send("No songs have been played yet.")
+            return
+
+        lines = [
+            f"{i}. {track['title'][:MAX_TITLE_LENGTH]} ({track['play_count']} plays)"
+            for i, track in enumerate(tracks, start=1)
+        ]
+        await ctx.send("```\n" + "\n".join(lines) + "\n```")
+
+    @commands.command(name='broadcast', help='Plays a song in every voice channel the bot is connected to.')
+    @commands.is_owner()
+    async def broadcast(self, ctx, url):
+        players = [
+            player for player in self.players.values()
+            if player.voice_client and player.voice_client.is_connected() and player.current_song is None
+        ]
+        if not players:
+            await ctx.send("I am not in any idle voice channels.")
+            return
+
+        try:
+            song_info = await get_song_info(url)
+            stream = await get_broadcast(url)
+        except youtube_dl.utils.DownloadError:
+            await ctx.send("Error: Invalid URL or file path. Please try again.")
+            return
+
+        if stream is None:
+            await ctx.send(f"Error: Could not stream {song_info['title']}.")
+            return
+
+        # One ffmpeg feeds every guild; each voice client reads the shared buffer at its own pace.
+        started = await asyncio.gather(*(
+            player.submit(self.start_broadcast, player, stream, song_info) for player in players
+        ))
+        if not any(started):
+            stream.release()
+            await ctx.send("I am not in any idle voice channels.")
+            return
+
+        await ctx.send(f"Broadcasting {song_info['title']} to {sum(started)} voice channels.")
+
+    async def start_broadcast(self, player, stream, song_info):
+        """Subscribes an idle player to a broadcast. Must run inside the player's mailbox.
+
+        Returns:
+            bool: Whether the player started playing the broadcast.
+        """
+        voice_client = player.voice_client
+        if (
+            player.current_song is not None
+            or voice_client is None
+            or not voice_client.is_connected()
+            or voice_client.is_playing()
+            or voice_client.is_paused()
+        ):
+            return False
+
+        source = stream.subscribe()
+        player.current_song = song_info
+        player.current_source = source
+        loop = asyncio.get_running_loop()
+        voice_client.play(
+            source,
+            after=lambda e: loop.call_soon_threadsafe(player.post, self.broadcast_finished, player, source),
+        )
+        self.history_writer.record(player.guild_id, song_info)
+        return True
+
+    async def broadcast_finished(self, player, source):
+        """Frees a player once its broadcast ends, then plays anything queued meanwhile."""
+        if source is not player.current_source:
+            return
+
+        player.current_song = None
+        player.current_source = None
+        if player.queue and player.ctx:
+            await self.play_next(player.ctx, player)
+
+    @tasks.loop(seconds=config['IDLE_CHECK_INTERVAL'])
+    async def reap_idle_players(self):
+        """Queues a reap for every player that has been idle past its timeout."""
+        now = time.monotonic()
+        for guild_id, player in list(self.players.items()):
+            reason = self.idle_reason(player, now)
+            if reason:
+                player.post(self.reap, guild_id, player, reason)
+
+    def idle_reason(self, player, now):
+        """Returns why a player should be reaped, or None if it is still in use.
+
+        A player is idle when it has no voice connection, is alone in its
+        channel, is paused, or has nothing playing or queued for longer than the
+        matching configured timeout. The disconnected timeout gives the voice
+        client time to reconnect without losing what is playing or queued.
+
+        Args:
+            player (GuildPlayer): The guild's player.
+            now (float): The current `time.monotonic()` reading.
+
+        Returns:
+            str: A description of the idle condition, or None.
+        """
+        voice_client = player.voice_client
+        if voice_client is None or not voice_client.is_connected():
+            conditions = {"disconnected": (True, config['IDLE_DISCONNECTED_TIMEOUT'])}
+        else:
+            conditions = {
+                "alone in channel": (
+                    not any(not member.bot for member in voice_client.channel.members),
+                    config['IDLE_EMPTY_CHANNEL_TIMEOUT'],
+                ),
+                "paused": (voice_client.is_paused(), config['IDLE_PAUSE_TIMEOUT']),
+                "nothing to play": (
+                    not voice_client.is_playing() and not voice_client.is_paused() and not player.queue,
+                    config['IDLE_TIMEOUT'],
+                ),
+            }
+        # Conditions that no longer apply restart their clock the next time they do.
+        for condition in list(player.idle_since):
+            if not conditions.get(condition, (False, None))[0]:
+                del player.idle_since[condition]
+
+        reason = None
+        for condition, (active, timeout) in conditions.items():
+            if not active:
+                continue
+            since = player.idle_since.setdefault(condition, now)
+            if reason is None and now - since >= timeout:
+                reason = condition
+        return reason
+
+    async def reap(self, guild_id, player, reason):
+        """Disconnects an idle player and frees its source, ffmpeg process and state."""
+        # A command may have brought the player back into use since the sweep.
+        if self.idle_reason(player, time.monotonic()) != reason:
+            return
+
+        player.queue = []
+        player.queue_pages.clear()
+        player.current_song = None
+        player.current_source = None
+        player.idle_since.clear()
+        if player.voice_client:
+            # Stopping makes the audio player clean up the source and its ffmpeg. Disconnecting
+            # alone skips that when the connection is already gone.
+            player.voice_client.stop()
+            await player.voice_client.disconnect(force=True)
+            player.voice_client = None
+
+        # Only forget the player if no command queued up behind the reap.
+        if self.players.get(guild_id) is player and not player.pending:
+            del self.players[guild_id]
+        logger.info(f"Reaped idle player for guild {guild_id}: {reason}.")
+
+    @reap_idle_players.before_loop
+    async def before_reap_idle_players(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=config['CACHE_WARM_INTERVAL'])
+    async def warm_caches(self):
+        """Pre-resolves metadata for the most played tracks, at startup and then periodically."""
+        try:
+            await warm_song_info_cache()
+        except Exception as e:
+            logger.error(f"Error warming song info cache: {e}")
+
+    @warm_caches.before_loop
+    async def before_warm_caches(self):
+        await self.bot.wait_until_ready()
+
+    async def play_next(self, ctx, player):
+        """Starts the next song in the queue. Must run inside the player's mailbox."""
+        if len(player.queue) > 0:
+            player.current_song = player.queue.pop(0)
+            player.queue_pages.clear()
             try:
-                audio_stream = await get_audio_stream(self.current_song['url'])
+                audio_stream = await get_audio_stream(player.current_song['url'])
             except youtube_dl.utils.DownloadError:
-                await ctx.send(f"Error: Could not download {self.current_song['title']}. Skipping.")
-                return await self.play_next(ctx)
+                audio_stream = None
+            if audio_stream is None:
+                await ctx.send(f"Error: Could not download {player.current_song['title']}. Skipping.")
+                return await self.play_next(ctx, player)
+
+            audio_stream.filter.volume = player.volume_level
+            loudness = await asyncio.get_running_loop().run_in_executor(None, get_track_loudness, player.current_song['url'])
+            if loudness:
+                audio_stream.filter.gain = get_normalization_gain(loudness)
+            else:
+                self.loudness_analyzer.enqueue(player.current_song)
 
-            self.voice_client.play(audio_stream, after=lambda e: asyncio.run_coroutine_threadsafe(self.play_next(ctx), self.bot.loop).result())
-            await ctx.send(f"Now playing: {self.current_song['title']} by {self.current_song['artist']}")
+            player.current_source = audio_stream
+            loop = asyncio.get_running_loop()
+            try:
+                player.voice_client.play(
+                    audio_stream,
+                    after=lambda e: loop.call_soon_threadsafe(player.post, self.song_finished, ctx, player, audio_stream),
+                )
+            except discord.ClientException as e:
+                # The source was never handed to the voice client, so nothing else will clean it up.
+                audio_stream.cleanup()
+                logger.error(f"Error starting playback in guild {player.guild_id}: {e}")
+                await ctx.send(f"Error: Could not play {player.current_song['title']}.")
+                player.current_song = None
+                player.current_source = None
+                return
+            self.history_writer.record(player.guild_id, player.current_song)
+            await ctx.send(f"Now playing: {player.current_song['title']} by {player.current_song['artist']}")
+        else:
+            player.current_song = None
+            player.current_source = None
+
+    async def song_finished(self, ctx, player, source):
+        """Advances the queue after `source` ends, unless a command already moved past it."""
+        if source is not player.current_source:
+            return
 
-            while self.song_loop:
-                if not self.voice_client.is_playing():
-                    await self.play_next(ctx)
+        if player.song_loop and player.current_song:
+            player.queue.insert(0, player.current_song)
+        await self.play_next(ctx, player)
 
     async def cog_command_error(self, ctx, error):
-        await ctx.send(f'An error occurred: {error}')
+        await handle_error(error, ctx)
 
 def setup(bot):
     bot.add_cog(MusicCog(bot))
\ No newline at end of file
@@ -1,4 +1,6 @@
 import os
+import logging
+import time
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
@@ -6,10 +8,15 @@ import psycopg2
 import redis
 
 from utils.config_utils import load_config
-from utils.database_utils import connect_to_database
+from utils.database_utils import connect_to_database, ensure_server_settings
+from utils.monitor_utils import loop_monitor
+from utils.logging_utils import setup_logging, command_context
+from utils.error_handling import handle_error
 
 load_dotenv()
 config = load_config()
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize Discord bot
 intents = discord.Intents.default()
@@ -23,15 +30,46 @@ db_cursor = db_connection.cursor()
 # Connect to Redis cache
 redis_client = redis.Redis.from_url(config['REDIS_URL'])
 
+# Attribute event loop stalls to the command that caused them, and log each command's latency
+@bot.before_invoke
+async def before_command(ctx):
+    ctx.started_at = time.monotonic()
+    loop_monitor.track_command(ctx)
+
+@bot.after_invoke
+async def after_command(ctx):
+    loop_monitor.untrack_command(ctx)
+    latency = time.monotonic() - ctx.started_at
+    logger.info("Command completed", extra=command_context(ctx, latency=latency))
+
+# Unknown commands are ignored; cogs with their own error handler report errors themselves
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    if ctx.cog and ctx.cog.has_error_handler():
+        return
+    await handle_error(error, ctx)
+
+# Make sure every server has a settings row before any command needs it
+@bot.event
+async def on_guild_join(guild):
+    await bot.loop.run_in_executor(None, ensure_server_settings, [guild.id])
+
 # Load cogs
 @bot.event
 async def on_ready():
-    print(f'Logged in as {bot.user}')
+    logger.info(f'Logged in as {bot.user}')
+    loop_monitor.start()
+
+    # Create missing settings rows and preload all settings in one pass
+    server_settings = await bot.loop.run_in_executor(None, ensure_server_settings, [guild.id for guild in bot.guilds])
+    logger.info(f'Loaded settings for {len(server_settings)} servers')
 
     # Load cogs
     for filename in os.listdir('cogs'):
         if filename.endswith('.py'):
             await bot.load_extension(f'cogs.{filename[:-3]}')
 
-# Run the bot
-bot.run(config['DISCORD_TOKEN'])
\ No newline at end of file
+# Run the bot; discord.py's own logs go through the queued root handler set up above
+bot.run(config['DISCORD_TOKEN'], log_handler=None)
\ No newline at end of file
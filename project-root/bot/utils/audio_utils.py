@@ -0,0 +1,327 @@
+import ctypes
+import logging
+import threading
+
+import discord
+
+from utils.config_utils import get_config
+from utils.filter_utils import GainFilter, VOLUME_RAMP_SECONDS
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+# Size in bytes of one 20 ms frame of 48 kHz stereo 16-bit PCM.
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+
+# Number of 20 ms Opus frames kept in a broadcast ring buffer (10 seconds).
+BROADCAST_BUFFER_FRAMES = 500
+
+# How long a listener waits for the next frame before treating the stream as stalled.
+FRAME_WAIT_TIMEOUT = 5
+
+# Running totals across every buffered source, shown by !loopstats for sizing AUDIO_BUFFER_FRAMES per host.
+buffer_stats = {'frames': 0, 'underruns': 0}
+_buffer_stats_lock = threading.Lock()
+
+# Active broadcasts, keyed by the song URL they were started for.
+_broadcasts = {}
+_broadcasts_lock = threading.Lock()
+
+
+class BroadcastStream:
+    """Decodes and encodes a track once and fans its Opus frames out to many voice clients.
+
+    A single ffmpeg process writes Opus packets into a shared ring buffer. Every
+    listener reads the buffer through its own cursor, so any number of guilds can
+    play the same track for the cost of one ffmpeg. The producer stays at most a
+    buffer ahead of the furthest listener, so a paused or reconnecting guild
+    never holds back the others; it skips ahead when it resumes.
+
+    Args:
+        audio_url (str): The URL ffmpeg should read the audio from.
+        capacity (int): The number of frames kept in the ring buffer.
+        **ffmpeg_kwargs: Extra `before_options`/`options` passed to ffmpeg.
+    """
+
+    def __init__(self, audio_url, capacity=BROADCAST_BUFFER_FRAMES, **ffmpeg_kwargs):
+        self.audio_url = audio_url
+        self.capacity = capacity
+        self._frames = [None] * capacity
+        self._head = 0
+        self._listeners = set()
+        self._finished = False
+        self._condition = threading.Condition()
+        self._source = discord.FFmpegOpusAudio(audio_url, **ffmpeg_kwargs)
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def subscribe(self):
+        """Creates a new listener that starts at the live edge of the stream.
+
+        Returns:
+            BroadcastSource: An audio source to hand to `VoiceClient.play`.
+        """
+        with self._condition:
+            listener = BroadcastSource(self, self._head)
+            self._listeners.add(listener)
+            if not self._thread.is_alive() and not self._finished:
+                self._thread.start()
+            return listener
+
+    def unsubscribe(self, listener):
+        """Detaches a listener and stops the stream once nobody is listening.
+
+        Args:
+            listener (BroadcastSource): The listener to detach.
+        """
+        with self._condition:
+            self._listeners.discard(listener)
+            if not self._listeners:
+                self._finished = True
+            self._condition.notify_all()
+        if self._finished and not self._thread.is_alive():
+            self._close()
+
+    def release(self):
+        """Stops the stream if nobody ever subscribed to it."""
+        with self._condition:
+            if self._listeners:
+                return
+            self._finished = True
+        if not self._thread.is_alive():
+            self._close()
+
+    def read_frame(self, cursor):
+        """Returns the frame at `cursor`, waiting for the producer if needed.
+
+        Listeners that fall more than a full buffer behind, such as paused ones,
+        skip ahead to the oldest frame still held.
+
+        Args:
+            cursor (int): The absolute index of the frame to read.
+
+        Returns:
+            tuple: The frame (empty bytes at end of stream) and the next cursor.
+        """
+        with self._condition:
+            while cursor >= self._head and not self._finished:
+                if not self._condition.wait(FRAME_WAIT_TIMEOUT):
+                    return b'', cursor
+            if cursor >= self._head:
+                return b'', cursor
+            cursor = max(cursor, self._head - self.capacity)
+            frame = self._frames[cursor % self.capacity]
+            self._condition.notify_all()
+            return frame, cursor + 1
+
+    def _pump(self):
+        """Reads Opus packets from ffmpeg into the ring buffer until the track ends."""
+        try:
+            while not self._finished:
+                frame = self._source.read()
+                with self._condition:
+                    if not frame:
+                        break
+                    # Pace the producer to the furthest listener, which voice clients read at real time.
+                    self._condition.wait_for(
+                        lambda: self._finished or self._head - self._furthest_cursor() < self.capacity
+                    )
+                    self._frames[self._head % self.capacity] = frame
+                    self._head += 1
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+            self._close()
+
+    def _furthest_cursor(self):
+        if not self._listeners:
+            return self._head
+        return max(listener.cursor for listener in self._listeners)
+
+    def _close(self):
+        """Stops ffmpeg and forgets the stream, so a later broadcast of the song starts afresh."""
+        self._source.cleanup()
+        with _broadcasts_lock:
+            for url, stream in list(_broadcasts.items()):
+                if stream is self:
+                    del _broadcasts[url]
+
+
+class BroadcastSource(discord.AudioSource):
+    """A single voice client's view of a `BroadcastStream`.
+
+    Args:
+        stream (BroadcastStream): The stream to read frames from.
+        cursor (int): The absolute frame index to start reading at.
+    """
+
+    def __init__(self, stream, cursor):
+        self.stream = stream
+        self.cursor = cursor
+
+    def read(self):
+        frame, self.cursor = self.stream.read_frame(self.cursor)
+        return frame
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.stream.unsubscribe(self)
+
+
+class BufferedPCMAudio(discord.FFmpegPCMAudio):
+    """An ffmpeg PCM source that reads ahead into a preallocated ring buffer.
+
+    A reader thread pulls ffmpeg's stdout straight into fixed frame slots of a
+    single `bytearray` with `readinto`, so steady-state playback allocates no
+    per-frame buffers, and up to `capacity` frames of read-ahead absorb network
+    jitter. Reads that find the buffer empty are counted as underruns. Volume,
+    fades and normalization gain are applied in-process by a `GainFilter`.
+
+    Args:
+        source (str): The URL or path ffmpeg should read the audio from.
+        capacity (int): The number of frames of read-ahead to hold.
+        prebuffer (int): The number of frames to buffer before the first read returns.
+        **kwargs: Extra arguments passed to `discord.FFmpegPCMAudio`.
+    """
+
+    def __init__(self, source, capacity=None, prebuffer=None, **kwargs):
+        super().__init__(source, **kwargs)
+        self.capacity = capacity or config['AUDIO_BUFFER_FRAMES']
+        self.prebuffer = min(prebuffer or config['AUDIO_PREBUFFER_FRAMES'], self.capacity)
+        self.underruns = 0
+        self.frames_played = 0
+        self.filter = GainFilter()
+        self._buffer = bytearray(self.capacity * FRAME_SIZE)
+        buffer_view = memoryview(self._buffer)
+        self._slots = [buffer_view[i * FRAME_SIZE:(i + 1) * FRAME_SIZE] for i in range(self.capacity)]
+        # The encoder casts its input with ctypes, which accepts a ctypes array but not a
+        # bytearray, so frames are handed out through one reusable ctypes buffer.
+        self._frame = (ctypes.c_char * FRAME_SIZE)()
+        self._frame_view = memoryview(self._frame).cast('B')
+        self._read_index = 0
+        self._write_index = 0
+        self._primed = False
+        self._eof = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._reader = threading.Thread(target=self._fill, daemon=True)
+        self._reader.start()
+
+    @property
+    def volume(self):
+        return self.filter.volume
+
+    @volume.setter
+    def volume(self, value):
+        self.filter.fade(value, VOLUME_RAMP_SECONDS)
+
+    def read(self):
+        with self._condition:
+            if not self._primed:
+                self._condition.wait_for(lambda: self._primed or self._eof, timeout=FRAME_WAIT_TIMEOUT)
+            if self._read_index >= self._write_index:
+                if self._eof:
+                    return b''
+                self.underruns += 1
+                with _buffer_stats_lock:
+                    buffer_stats['underruns'] += 1
+                self._condition.wait_for(
+                    lambda: self._read_index < self._write_index or self._eof,
+                    timeout=FRAME_WAIT_TIMEOUT,
+                )
+                if self._read_index >= self._write_index:
+                    return b''
+            self._frame_view[:] = self._slots[self._read_index % self.capacity]
+            self._read_index += 1
+            self._condition.notify_all()
+        self.filter.apply(self._frame)
+        self.frames_played += 1
+        return self._frame
+
+    def cleanup(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        super().cleanup()
+        with _buffer_stats_lock:
+            buffer_stats['frames'] += self.frames_played
+        if self.underruns:
+            logger.info(
+                f"Audio buffer underran {self.underruns} times in {self.frames_played} frames "
+                f"(capacity {self.capacity} frames)."
+            )
+
+    def _fill(self):
+        """Reads ffmpeg output into free frame slots until the stream ends or is closed."""
+        stdout = self._stdout
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self._closed or self._write_index - self._read_index < self.capacity
+                    )
+                    if self._closed:
+                        return
+                    slot = self._slots[self._write_index % self.capacity]
+
+                filled = 0
+                while filled < FRAME_SIZE:
+                    count = stdout.readinto(slot[filled:])
+                    if not count:
+                        break
+                    filled += count
+
+                with self._condition:
+                    # A trailing partial frame is dropped, as FFmpegPCMAudio does.
+                    if filled < FRAME_SIZE:
+                        break
+                    self._write_index += 1
+                    if self._write_index - self._read_index >= self.prebuffer:
+                        self._primed = True
+                    self._condition.notify_all()
+        except (OSError, ValueError):
+            # stdout was closed underneath us by cleanup().
+            pass
+        finally:
+            with self._condition:
+                self._eof = True
+                self._condition.notify_all()
+
+
+def get_buffer_stats():
+    """Returns the frames played and underruns counted across all buffered sources.
+
+    Frames are counted when a source is cleaned up, so songs still playing
+    are not included yet.
+
+    Returns:
+        dict: The `frames` and `underruns` totals.
+    """
+    with _buffer_stats_lock:
+        return dict(buffer_stats)
+
+
+def get_broadcast_stream(url, audio_url, **ffmpeg_kwargs):
+    """Returns the running broadcast for a song, starting one if needed.
+
+    Args:
+        url (str): The URL of the song, used to share the broadcast between guilds.
+        audio_url (str): The URL ffmpeg should read the audio from.
+        **ffmpeg_kwargs: Extra `before_options`/`options` passed to ffmpeg.
+
+    Returns:
+        BroadcastStream: The shared broadcast for the song.
+    """
+    with _broadcasts_lock:
+        stream = _broadcasts.get(url)
+        if stream is None or stream.finished:
+            stream = BroadcastStream(audio_url, **ffmpeg_kwargs)
+            _broadcasts[url] = stream
+        return stream
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import time
+
+import youtube_dl
+
+from utils.config_utils import get_config
+from utils.database_utils import get_most_played_tracks
+from utils.music_utils import get_cached_song_info, get_song_info
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+
+async def warm_song_info_cache(limit=None, budget=None, rate=None):
+    """Pre-resolves the metadata of the most played tracks into the song info cache.
+
+    Tracks already cached are skipped. Lookups are spaced to at most `rate` per
+    second and the run stops once `budget` seconds have been spent, so warming
+    never competes with user requests for the extractor for long.
+
+    Args:
+        limit (int): The number of most played tracks to consider.
+        budget (float): The most time the run may take, in seconds.
+        rate (float): The most metadata lookups to make per second.
+
+    Returns:
+        int: The number of tracks resolved into the cache.
+    """
+    limit = limit or config['CACHE_WARM_LIMIT']
+    budget = budget or config['CACHE_WARM_BUDGET']
+    rate = rate or config['CACHE_WARM_RATE']
+
+    loop = asyncio.get_running_loop()
+    urls = await loop.run_in_executor(None, get_most_played_tracks, limit)
+    if not urls:
+        return 0
+
+    deadline = time.monotonic() + budget
+    warmed = 0
+    for url in urls:
+        if time.monotonic() >= deadline:
+            break
+        if get_cached_song_info(url) is not None:
+            continue
+
+        started = time.monotonic()
+        try:
+            await get_song_info(url)
+            warmed += 1
+        except youtube_dl.utils.DownloadError as e:
+            logger.warning(f"Could not warm metadata for {url}: {e}")
+        await asyncio.sleep(max(1 / rate - (time.monotonic() - started), 0))
+
+    logger.info(f"Warmed song info cache with {warmed} of {len(urls)} most played tracks.")
+    return warmed
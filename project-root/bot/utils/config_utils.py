@@ -8,7 +8,33 @@ def load_config():
         'DISCORD_TOKEN': os.getenv('DISCORD_TOKEN'),
         'DATABASE_URL': os.getenv('DATABASE_URL'),
         'REDIS_URL': os.getenv('REDIS_URL'),
-        'DEFAULT_PREFIX': os.getenv('DEFAULT_PREFIX', '!')  # Default prefix if not specified
+        'DEFAULT_PREFIX': os.getenv('DEFAULT_PREFIX', '!'),  # Default prefix if not specified
+        'AUDIO_BUFFER_FRAMES': int(os.getenv('AUDIO_BUFFER_FRAMES', 250)),  # 20 ms PCM frames of read-ahead
+        'AUDIO_PREBUFFER_FRAMES': int(os.getenv('AUDIO_PREBUFFER_FRAMES', 25)),  # Frames buffered before playback starts
+        'MAX_CONCURRENT_EXTRACTIONS': int(os.getenv('MAX_CONCURRENT_EXTRACTIONS', 4)),  # Extractor calls allowed at once
+        'SONG_INFO_CACHE_SIZE': int(os.getenv('SONG_INFO_CACHE_SIZE', 5000)),  # Songs whose metadata is kept in memory
+        'SONG_INFO_CACHE_TTL': int(os.getenv('SONG_INFO_CACHE_TTL', 21600)),  # Seconds cached metadata stays valid
+        'CACHE_WARM_INTERVAL': int(os.getenv('CACHE_WARM_INTERVAL', 3600)),  # Seconds between cache warming runs
+        'CACHE_WARM_LIMIT': int(os.getenv('CACHE_WARM_LIMIT', 200)),  # Most played tracks considered per run
+        'CACHE_WARM_BUDGET': int(os.getenv('CACHE_WARM_BUDGET', 120)),  # Seconds a warming run may spend
+        'CACHE_WARM_RATE': float(os.getenv('CACHE_WARM_RATE', 2)),  # Metadata lookups per second while warming
+        'IDLE_CHECK_INTERVAL': int(os.getenv('IDLE_CHECK_INTERVAL', 30)),  # Seconds between idle voice session sweeps
+        'IDLE_TIMEOUT': int(os.getenv('IDLE_TIMEOUT', 300)),  # Seconds with nothing playing or queued before leaving
+        'IDLE_PAUSE_TIMEOUT': int(os.getenv('IDLE_PAUSE_TIMEOUT', 900)),  # Seconds paused before leaving
+        'IDLE_EMPTY_CHANNEL_TIMEOUT': int(os.getenv('IDLE_EMPTY_CHANNEL_TIMEOUT', 60)),  # Seconds alone in a channel before leaving
+        'IDLE_DISCONNECTED_TIMEOUT': int(os.getenv('IDLE_DISCONNECTED_TIMEOUT', 60)),  # Seconds without a voice connection before a player is freed
+        'HISTORY_BATCH_SIZE': int(os.getenv('HISTORY_BATCH_SIZE', 100)),  # Play events buffered before a write
+        'HISTORY_FLUSH_INTERVAL_MS': int(os.getenv('HISTORY_FLUSH_INTERVAL_MS', 5000)),  # Longest an event waits to be written
+        'LOOP_MONITOR_INTERVAL_MS': int(os.getenv('LOOP_MONITOR_INTERVAL_MS', 100)),  # Event loop heartbeat period
+        'LOOP_STALL_THRESHOLD_MS': int(os.getenv('LOOP_STALL_THRESHOLD_MS', 250)),  # Blocking longer than this is sampled
+        'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO'),  # Root log level
+        'LOG_SAMPLE_BURST': int(os.getenv('LOG_SAMPLE_BURST', 10)),  # Warnings of one kind always logged per window
+        'LOG_SAMPLE_WINDOW': int(os.getenv('LOG_SAMPLE_WINDOW', 60)),  # Seconds per sampling window
+        'LOG_SAMPLE_RATE': int(os.getenv('LOG_SAMPLE_RATE', 100)),  # Past the burst, log one warning in this many
+        'LOUDNESS_TARGET': float(os.getenv('LOUDNESS_TARGET', -16.0)),  # Integrated loudness to normalize to, in LUFS
+        'TRUE_PEAK_LIMIT': float(os.getenv('TRUE_PEAK_LIMIT', -1.0)),  # Highest true peak normalization may reach, in dBTP
+        'MAX_NORMALIZATION_GAIN_DB': float(os.getenv('MAX_NORMALIZATION_GAIN_DB', 12.0)),  # Most a quiet track is boosted by, in dB
+        'LOUDNESS_ANALYSIS_SECONDS': int(os.getenv('LOUDNESS_ANALYSIS_SECONDS', 600)),  # Longest stretch of a track analyzed, so live streams end
     }
 
 def get_config():
@@ -1,7 +1,11 @@
+import logging
+
 import psycopg2
+from psycopg2.extras import execute_values
 from utils.config_utils import get_config
 
 config = get_config()
+logger = logging.getLogger(__name__)
 
 def connect_to_database(database_url):
     """Establishes a connection to the PostgreSQL database.
@@ -16,42 +20,89 @@ def connect_to_database(database_url):
         connection = psycopg2.connect(database_url)
         return connection
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        logger.error(f"Error connecting to database: {e}", extra={"error_class": type(e).__name__})
         return None
 
-def get_server_settings(server_id):
-    """Retrieves server settings from the database.
+# Settings of every known server, loaded in bulk at startup and kept in sync on update.
+server_settings_cache = {}
+
+def _copy_server_settings(server_settings):
+    return {**server_settings, "ALLOWED_SOURCES": list(server_settings["ALLOWED_SOURCES"])}
+
+def ensure_server_settings(server_ids, batch_size=1000):
+    """Creates default settings for servers that have none and loads their settings into memory.
+
+    Missing rows are created with batched `INSERT ... ON CONFLICT DO NOTHING`
+    statements, and the settings of all the given servers are then read back
+    with a single query, all on one connection.
 
     Args:
-        server_id (int): The ID of the Discord server.
+        server_ids (list): The IDs of the Discord servers.
+        batch_size (int): The number of rows inserted per statement.
 
     Returns:
-        dict: A dictionary containing the server settings.
+        dict: The settings of each server, keyed by server ID. Empty if the database is unreachable.
     """
+    server_ids = list(server_ids)
+    if not server_ids:
+        return {}
+
     connection = connect_to_database(config['DATABASE_URL'])
+    if connection is None:
+        return {}
     cursor = connection.cursor()
     try:
+        execute_values(
+            cursor,
+            "INSERT INTO server_settings (server_id) VALUES %s ON CONFLICT (server_id) DO NOTHING",
+            [(server_id,) for server_id in server_ids],
+            page_size=batch_size,
+        )
         cursor.execute(
-            "SELECT * FROM server_settings WHERE server_id = %s", (server_id,)
+            "SELECT server_id, default_prefix, default_source, allowed_sources FROM server_settings "
+            "WHERE server_id = ANY(%s)",
+            (server_ids,),
         )
-        server_settings = cursor.fetchone()
-        if server_settings:
-            return {
-                "DEFAULT_PREFIX": server_settings[1],
-                "DEFAULT_SOURCE": server_settings[2],
-                "ALLOWED_SOURCES": server_settings[3].split(","),
+        connection.commit()
+        loaded = {
+            row[0]: {
+                "DEFAULT_PREFIX": row[1],
+                "DEFAULT_SOURCE": row[2],
+                "ALLOWED_SOURCES": row[3].split(","),
             }
-        else:
-            return None
+            for row in cursor.fetchall()
+        }
+        server_settings_cache.update(loaded)
+        return loaded
     except Exception as e:
-        print(f"Error retrieving server settings: {e}")
-        return None
+        connection.rollback()
+        logger.error(f"Error ensuring server settings: {e}", extra={"error_class": type(e).__name__})
+        return {}
     finally:
         cursor.close()
         connection.close()
 
+def get_server_settings(server_id):
+    """Retrieves server settings, from memory when preloaded.
+
+    Servers that have no settings row yet get one with the defaults.
+
+    Args:
+        server_id (int): The ID of the Discord server.
+
+    Returns:
+        dict: A dictionary containing the server settings, or None if the database is unreachable.
+    """
+    server_settings = server_settings_cache.get(server_id)
+    if server_settings is None:
+        server_settings = ensure_server_settings([server_id]).get(server_id)
+        if server_settings is None:
+            return None
+    # Callers edit the returned settings before saving them, so hand out a copy.
+    return _copy_server_settings(server_settings)
+
 def update_server_settings(server_id, server_settings):
-    """Updates server settings in the database.
+    """Updates server settings in the database and in memory.
 
     Args:
         server_id (int): The ID of the Discord server.
@@ -61,17 +112,21 @@ def update_server_settings(server_id, server_settings):
     cursor = connection.cursor()
     try:
         cursor.execute(
-            "UPDATE server_settings SET default_prefix = %s, default_source = %s, allowed_sources = %s WHERE server_id = %s",
+            "INSERT INTO server_settings (server_id, default_prefix, default_source, allowed_sources) "
+            "VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (server_id) DO UPDATE SET default_prefix = EXCLUDED.default_prefix, "
+            "default_source = EXCLUDED.default_source, allowed_sources = EXCLUDED.allowed_sources",
             (
+                server_id,
                 server_settings['DEFAULT_PREFIX'],
                 server_settings['DEFAULT_SOURCE'],
                 ",".join(server_settings['ALLOWED_SOURCES']),
-                server_id,
             ),
         )
         connection.commit()
+        server_settings_cache[server_id] = _copy_server_settings(server_settings)
     except Exception as e:
-        print(f"Error updating server settings: {e}")
+        logger.error(f"Error updating server settings: {e}", extra={"error_class": type(e).__name__})
     finally:
         cursor.close()
         connection.close()
@@ -97,7 +152,42 @@ def get_playlists(server_id):
             for playlist in playlists
         ]
     except Exception as e:
-        print(f"Error retrieving playlists: {e}")
+        logger.error(f"Error retrieving playlists: {e}", extra={"error_class": type(e).__name__})
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+def get_playlist_names(server_id, after=None, limit=20):
+    """Retrieves one page of playlist names, ordered by name.
+
+    Only the names are read, and paging uses the last name seen as a cursor,
+    so each page costs a single index range scan regardless of catalog size.
+
+    Args:
+        server_id (int): The ID of the Discord server.
+        after (str): The last playlist name of the previous page, or None for the first page.
+        limit (int): The maximum number of names to return.
+
+    Returns:
+        list: The playlist names on the page.
+    """
+    connection = connect_to_database(config['DATABASE_URL'])
+    cursor = connection.cursor()
+    try:
+        if after is None:
+            cursor.execute(
+                "SELECT name FROM playlists WHERE server_id = %s ORDER BY name LIMIT %s",
+                (server_id, limit),
+            )
+        else:
+            cursor.execute(
+                "SELECT name FROM playlists WHERE server_id = %s AND name > %s ORDER BY name LIMIT %s",
+                (server_id, after, limit),
+            )
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error retrieving playlist names: {e}", extra={"error_class": type(e).__name__})
         return None
     finally:
         cursor.close()
@@ -119,7 +209,7 @@ def create_playlist(server_id, name):
         )
         connection.commit()
     except Exception as e:
-        print(f"Error creating playlist: {e}")
+        logger.error(f"Error creating playlist: {e}", extra={"error_class": type(e).__name__})
     finally:
         cursor.close()
         connection.close()
@@ -149,9 +239,9 @@ def add_to_playlist(server_id, playlist_name, url):
             )
             connection.commit()
         else:
-            print(f"Playlist '{playlist_name}' not found.")
+            logger.warning(f"Playlist '{playlist_name}' not found.")
     except Exception as e:
-        print(f"Error adding song to playlist: {e}")
+        logger.error(f"Error adding song to playlist: {e}", extra={"error_class": type(e).__name__})
     finally:
         cursor.close()
         connection.close()
@@ -182,11 +272,11 @@ def remove_from_playlist(server_id, playlist_name, url):
                 )
                 connection.commit()
             else:
-                print(f"Song '{url}' not found in playlist '{playlist_name}'.")
+                logger.warning(f"Song '{url}' not found in playlist '{playlist_name}'.")
         else:
-            print(f"Playlist '{playlist_name}' not found.")
+            logger.warning(f"Playlist '{playlist_name}' not found.")
     except Exception as e:
-        print(f"Error removing song from playlist: {e}")
+        logger.error(f"Error removing song from playlist: {e}", extra={"error_class": type(e).__name__})
     finally:
         cursor.close()
         connection.close()
@@ -207,7 +297,174 @@ def delete_playlist(server_id, name):
         )
         connection.commit()
     except Exception as e:
-        print(f"Error deleting playlist: {e}")
+        logger.error(f"Error deleting playlist: {e}", extra={"error_class": type(e).__name__})
+    finally:
+        cursor.close()
+        connection.close()
+
+def get_track_loudness(url):
+    """Retrieves the stored loudness analysis for a track.
+
+    Args:
+        url (str): The URL of the song.
+
+    Returns:
+        dict: The integrated loudness (LUFS) and true peak (dBTP), or None if not analyzed.
+    """
+    connection = connect_to_database(config['DATABASE_URL'])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT integrated_loudness, true_peak FROM track_metadata WHERE url = %s", (url,)
+        )
+        track = cursor.fetchone()
+        if track:
+            return {"integrated_loudness": track[0], "true_peak": track[1]}
+        else:
+            return None
+    except Exception as e:
+        logger.error(f"Error retrieving track loudness: {e}", extra={"error_class": type(e).__name__})
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+def save_track_loudness(song_info, integrated_loudness, true_peak):
+    """Stores the loudness analysis for a track alongside its metadata.
+
+    Args:
+        song_info (dict): The song information returned by `get_song_info`.
+        integrated_loudness (float): The integrated loudness of the track in LUFS.
+        true_peak (float): The true peak of the track in dBTP.
+    """
+    connection = connect_to_database(config['DATABASE_URL'])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO track_metadata (url, title, artist, integrated_loudness, true_peak) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (url) DO UPDATE SET title = EXCLUDED.title, artist = EXCLUDED.artist, "
+            "integrated_loudness = EXCLUDED.integrated_loudness, true_peak = EXCLUDED.true_peak, "
+            "analyzed_at = NOW()",
+            (
+                song_info['url'],
+                song_info['title'],
+                song_info['artist'],
+                integrated_loudness,
+                true_peak,
+            ),
+        )
+        connection.commit()
+    except Exception as e:
+        logger.error(f"Error saving track loudness: {e}", extra={"error_class": type(e).__name__})
+    finally:
+        cursor.close()
+        connection.close()
+
+def insert_play_events(events):
+    """Writes a batch of play events and rolls them up into per-server play counts.
+
+    The whole batch is written in one transaction with two multi-row
+    statements, however many events it holds. A batch the database rejects
+    as invalid is dropped, since writing it again would fail the same way.
+
+    Args:
+        events (list): Dictionaries with `server_id`, `url`, `title` and `played_at` keys.
+
+    Returns:
+        bool: False if the batch was not written and is worth retrying.
+    """
+    rollup = {}
+    for event in events:
+        key = (event['server_id'], event['url'])
+        if key in rollup:
+            count, _, last_played_at = rollup[key]
+            rollup[key] = (count + 1, event['title'], max(last_played_at, event['played_at']))
+        else:
+            rollup[key] = (1, event['title'], event['played_at'])
+
+    connection = connect_to_database(config['DATABASE_URL'])
+    cursor = connection.cursor()
+    try:
+        execute_values(
+            cursor,
+            "INSERT INTO play_history (server_id, url, title, played_at) VALUES %s",
+            [(event['server_id'], event['url'], event['title'], event['played_at']) for event in events],
+        )
+        execute_values(
+            cursor,
+            "INSERT INTO track_play_counts (server_id, url, play_count, title, last_played_at) VALUES %s "
+            "ON CONFLICT (server_id, url) DO UPDATE SET "
+            "play_count = track_play_counts.play_count + EXCLUDED.play_count, title = EXCLUDED.title, "
+            "last_played_at = GREATEST(track_play_counts.last_played_at, EXCLUDED.last_played_at)",
+            [(server_id, url) + values for (server_id, url), values in rollup.items()],
+        )
+        connection.commit()
+        return True
+    except psycopg2.DataError as e:
+        connection.rollback()
+        logger.error(
+            f"Dropping {len(events)} play events the database rejected: {e}",
+            extra={"error_class": type(e).__name__},
+        )
+        return True
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Error inserting play events: {e}", extra={"error_class": type(e).__name__})
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+def get_top_tracks(server_id, limit=10):
+    """Retrieves the most played tracks of a server.
+
+    Args:
+        server_id (int): The ID of the Discord server.
+        limit (int): The maximum number of tracks to return.
+
+    Returns:
+        list: Dictionaries with the `url`, `title` and `play_count` of each track.
+    """
+    connection = connect_to_database(config['DATABASE_URL'])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT url, title, play_count FROM track_play_counts WHERE server_id = %s "
+            "ORDER BY play_count DESC LIMIT %s",
+            (server_id, limit),
+        )
+        return [
+            {"url": track[0], "title": track[1], "play_count": track[2]}
+            for track in cursor.fetchall()
+        ]
+    except Exception as e:
+        logger.error(f"Error retrieving top tracks: {e}", extra={"error_class": type(e).__name__})
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+def get_most_played_tracks(limit=100):
+    """Retrieves the most played tracks across all servers.
+
+    Args:
+        limit (int): The maximum number of tracks to return.
+
+    Returns:
+        list: The URLs of the tracks, most played first.
+    """
+    connection = connect_to_database(config['DATABASE_URL'])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT url FROM track_play_counts GROUP BY url ORDER BY SUM(play_count) DESC LIMIT %s",
+            (limit,),
+        )
+        return [track[0] for track in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Error retrieving most played tracks: {e}", extra={"error_class": type(e).__name__})
+        return None
     finally:
         cursor.close()
         connection.close()
\ No newline at end of file
@@ -1,17 +1,46 @@
 import logging
 
+import discord
+from discord.ext import commands
+
+from utils.logging_utils import command_context
+
 logger = logging.getLogger(__name__)
 
-def handle_error(error, ctx):
+async def handle_error(error, ctx):
     """
     Handles errors and displays informative messages to users.
 
+    The error is logged with the guild, command and error class attached so
+    that failures can be aggregated. Failed checks and bad arguments are the
+    user's mistake, not the bot's, so they are only explained to the user.
+
     Args:
         error (Exception): The exception that occurred.
         ctx (commands.Context): The Discord context object.
     """
-    logger.error(f"An error occurred: {error}")
+    if isinstance(error, (commands.CheckFailure, commands.UserInputError)):
+        logger.info(f"Command rejected: {error}", extra=command_context(ctx, error))
+        await _send_error(ctx, str(error))
+        return
+
+    original = getattr(error, "original", error)
+    logger.error(
+        f"An error occurred: {error}",
+        exc_info=(type(original), original, original.__traceback__),
+        extra=command_context(ctx, error),
+    )
+    await _send_error(ctx, f"An error occurred: {error}")
+
+async def _send_error(ctx, message):
+    """
+    Sends an error message to the channel a command was invoked in.
+
+    Args:
+        ctx (commands.Context): The Discord context object.
+        message (str): The message to send.
+    """
     try:
-        await ctx.send(f"An error occurred: {error}")
+        await ctx.send(message)
     except discord.HTTPException:
-        logger.error("Failed to send error message to Discord.")
\ No newline at end of file
+        logger.error("Failed to send error message to Discord.", extra=command_context(ctx))
@@ -0,0 +1,78 @@
+import asyncio
+import datetime
+import logging
+
+from utils.config_utils import get_config
+from utils.database_utils import insert_play_events
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+
+class PlayHistoryWriter:
+    """Buffers play events in memory and writes them to the database in batches.
+
+    Recording a play is a list append; a background task writes the buffer
+    whenever it reaches `batch_size` events or `flush_interval` seconds pass,
+    using one multi-row insert per batch off the event loop.
+
+    Args:
+        batch_size (int): The number of buffered events that triggers a write.
+        flush_interval (float): The longest an event waits to be written, in seconds.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or config['HISTORY_BATCH_SIZE']
+        self.flush_interval = flush_interval or config['HISTORY_FLUSH_INTERVAL_MS'] / 1000
+        # Cap on events held while the database is unreachable, after which the oldest are dropped.
+        self.max_buffered = self.batch_size * 10
+        self._buffer = []
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def record(self, server_id, song_info):
+        """Buffers a play event for the next batch.
+
+        Args:
+            server_id (int): The ID of the Discord server.
+            song_info (dict): The song information returned by `get_song_info`.
+        """
+        self._buffer.append({
+            'server_id': server_id,
+            'url': song_info['url'],
+            'title': song_info['title'],
+            'played_at': datetime.datetime.utcnow(),
+        })
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self):
+        """Writes every buffered event now."""
+        if not self._buffer:
+            return
+
+        events, self._buffer = self._buffer, []
+        done = await asyncio.get_running_loop().run_in_executor(None, insert_play_events, events)
+        if not done:
+            # Keep the batch for the next attempt, without letting an outage grow the buffer forever.
+            self._buffer = (events + self._buffer)[-self.max_buffered:]
+
+    async def close(self):
+        """Stops the background task and writes any remaining events."""
+        if self._task:
+            self._task.cancel()
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error writing play history: {e}")
@@ -0,0 +1,148 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from utils.config_utils import get_config
+
+config = get_config()
+
+# Fields callers may attach with `extra=` that are copied into every JSON record.
+CONTEXT_FIELDS = ("guild_id", "command", "latency_ms", "error_class")
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats log records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """A queue handler that keeps context fields and tracebacks as separate fields.
+
+    The stock `QueueHandler` flattens each record into a preformatted string;
+    this one only resolves the message and traceback text, so the listener's
+    formatter still sees the structured record.
+    """
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Lets the first `burst` records of a kind through per window, then one in `rate`.
+
+    Records are grouped by error class when one is attached, otherwise by the
+    logging call that made them, since messages arrive with their values
+    already filled in. Records below WARNING are never sampled. A record let
+    through after others were dropped carries the number dropped in `suppressed`.
+
+    Args:
+        burst (int): Records of a kind always let through per window.
+        window (float): Length of a window in seconds.
+        rate (int): After the burst, one record in this many is let through.
+    """
+
+    def __init__(self, burst=None, window=None, rate=None):
+        super().__init__()
+        self.burst = burst or config['LOG_SAMPLE_BURST']
+        self.window = window or config['LOG_SAMPLE_WINDOW']
+        self.rate = rate or config['LOG_SAMPLE_RATE']
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+
+        key = getattr(record, "error_class", None) or (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, seen, suppressed = self._counts.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, seen = now, 0
+            seen += 1
+            if seen <= self.burst or (seen - self.burst) % self.rate == 0:
+                record.suppressed = suppressed
+                self._counts[key] = (window_start, seen, 0)
+                return True
+            self._counts[key] = (window_start, seen, suppressed + 1)
+            return False
+
+
+def setup_logging(level=None):
+    """Routes all logging through a queue to a background thread that writes JSON lines.
+
+    Logging calls on the event loop only put the record on an in-memory queue;
+    formatting and writing to stdout happen on the listener thread.
+
+    Args:
+        level (str): The root log level, defaulting to LOG_LEVEL.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level or config['LOG_LEVEL'])
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def command_context(ctx, error=None, latency=None):
+    """Builds the `extra` fields that tie a log record to a command invocation.
+
+    Args:
+        ctx (commands.Context): The Discord context object.
+        error (Exception): The error raised by the command, if any.
+        latency (float): How long the command took, in seconds.
+
+    Returns:
+        dict: Fields to pass as `extra=` to a logging call.
+    """
+    extra = {
+        "guild_id": ctx.guild.id if ctx.guild else None,
+        "command": ctx.command.qualified_name if ctx.command else None,
+    }
+    if error is not None:
+        extra["error_class"] = type(getattr(error, "original", error)).__name__
+    if latency is not None:
+        extra["latency_ms"] = round(latency * 1000, 1)
+    return extra
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import math
+
+import ffmpeg
+
+from utils.config_utils import get_config
+from utils.database_utils import get_track_loudness, save_track_loudness
+from utils.music_utils import get_stream_url
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+
+def analyze_loudness(audio_url):
+    """Measures the integrated loudness and true peak of an audio stream.
+
+    This runs ffmpeg's loudnorm filter in analysis mode over at most the first
+    LOUDNESS_ANALYSIS_SECONDS of the stream, so it is slow and blocking; call
+    it from an executor. Silent tracks measure as negative infinity.
+
+    Args:
+        audio_url (str): The URL ffmpeg should read the audio from.
+
+    Returns:
+        tuple: The integrated loudness in LUFS and the true peak in dBTP.
+    """
+    _, stderr = (
+        ffmpeg
+        .input(
+            audio_url,
+            t=config['LOUDNESS_ANALYSIS_SECONDS'],
+            reconnect=1,
+            reconnect_streamed=1,
+            reconnect_delay_max=5,
+        )
+        .audio
+        .filter('loudnorm', print_format='json')
+        .output('-', format='null')
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    output = stderr.decode('utf-8', errors='replace')
+    stats = json.loads(output[output.rindex('{'):output.rindex('}') + 1])
+    return float(stats['input_i']), float(stats['input_tp'])
+
+
+def get_normalization_gain(loudness):
+    """Computes the linear gain that brings a track to the target loudness.
+
+    The gain is capped so the track's true peak stays under TRUE_PEAK_LIMIT
+    and no track is boosted by more than MAX_NORMALIZATION_GAIN_DB. Tracks
+    whose measurements are not finite, such as silent ones, are left unchanged.
+
+    Args:
+        loudness (dict): The stored analysis returned by `get_track_loudness`.
+
+    Returns:
+        float: The linear gain to apply to the track's samples.
+    """
+    integrated_loudness = loudness['integrated_loudness']
+    true_peak = loudness['true_peak']
+    if not math.isfinite(integrated_loudness) or not math.isfinite(true_peak):
+        return 1.0
+
+    gain_db = config['LOUDNESS_TARGET'] - integrated_loudness
+    gain_db = min(gain_db, config['TRUE_PEAK_LIMIT'] - true_peak, config['MAX_NORMALIZATION_GAIN_DB'])
+    return 10 ** (gain_db / 20)
+
+
+class LoudnessAnalyzer:
+    """Analyzes the loudness of played tracks in the background, one track at a time.
+
+    Results are stored with the track's metadata so later plays can apply a
+    precomputed gain instead of running a loudnorm pass on every stream.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self._pending = set()
+        self._worker = None
+
+    def enqueue(self, song_info):
+        """Schedules a track for analysis unless it is already queued.
+
+        Args:
+            song_info (dict): The song information returned by `get_song_info`.
+        """
+        if song_info['url'] in self._pending:
+            return
+
+        self._pending.add(song_info['url'])
+        self._queue.put_nowait(song_info)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def close(self):
+        """Stops the background worker."""
+        if self._worker:
+            self._worker.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            song_info = await self._queue.get()
+            try:
+                if await loop.run_in_executor(None, get_track_loudness, song_info['url']) is None:
+                    audio_url = await get_stream_url(song_info['url'])
+                    if audio_url:
+                        integrated_loudness, true_peak = await loop.run_in_executor(None, analyze_loudness, audio_url)
+                        await loop.run_in_executor(None, save_track_loudness, song_info, integrated_loudness, true_peak)
+            except Exception as e:
+                logger.error(f"Error analyzing loudness of {song_info['url']}: {e}")
+            finally:
+                self._pending.discard(song_info['url'])
+                self._queue.task_done()
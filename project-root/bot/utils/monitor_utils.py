@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+
+from utils.config_utils import get_config
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+# Directory of the bot package, used to find the bot's own frames in a stack sample.
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LoopMonitor:
+    """Measures event loop scheduling lag and samples the stack when the loop stalls.
+
+    A heartbeat task sleeps for `interval` and records how late it wakes up.
+    A watchdog thread notices when the heartbeat stops beating for longer than
+    `threshold`, captures the loop thread's stack at that moment, and attributes
+    the stall to the command or player job being run, or failing that to the
+    innermost frame from the bot's own code.
+
+    Args:
+        interval (float): Seconds between heartbeats.
+        threshold (float): Seconds the loop must be blocked before a stall is recorded.
+        history (int): The number of stalls to keep.
+    """
+
+    def __init__(self, interval=None, threshold=None, history=50):
+        self.interval = interval or config['LOOP_MONITOR_INTERVAL_MS'] / 1000
+        self.threshold = threshold or config['LOOP_STALL_THRESHOLD_MS'] / 1000
+        self.lag_samples = deque(maxlen=int(60 / self.interval))
+        self.max_lag = 0.0
+        self.stalls = deque(maxlen=history)
+        self._command_tasks = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = None
+        self._sampled_beat = None
+        self._heartbeat = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Starts monitoring the running event loop. Calling it again is a no-op."""
+        if self._heartbeat and not self._heartbeat.done():
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        """Stops the heartbeat and watchdog."""
+        self._stopped.set()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+
+    def track_command(self, ctx):
+        """Attributes the current task to a command until it finishes.
+
+        Meant to be registered as a bot-wide `before_invoke` hook.
+
+        Args:
+            ctx (commands.Context): The context of the command being invoked.
+        """
+        cog = ctx.cog.qualified_name if ctx.cog else "Bot"
+        self.track_task(f"{cog}.{ctx.command.qualified_name}")
+
+    def untrack_command(self, ctx):
+        """Stops attributing the current task to a command."""
+        self.untrack_task()
+
+    def track_task(self, name):
+        """Attributes stalls in the current task to `name` until it is untracked.
+
+        Used for work that runs outside the command's own task, such as jobs
+        in a guild player's mailbox.
+
+        Args:
+            name (str): The name to report stalls under, such as "MusicCog.skip".
+        """
+        task = asyncio.current_task()
+        if task is not None:
+            self._command_tasks[task] = name
+
+    def untrack_task(self):
+        """Stops attributing the current task."""
+        task = asyncio.current_task()
+        if task is not None:
+            self._command_tasks.pop(task, None)
+
+    def get_stats(self):
+        """Summarizes recent loop lag.
+
+        Returns:
+            dict: The 50th and 99th percentile and maximum lag in seconds, and the sample count.
+        """
+        samples = sorted(self.lag_samples)
+        if not samples:
+            return {"p50": 0.0, "p99": 0.0, "max": self.max_lag, "samples": 0}
+
+        return {
+            "p50": samples[len(samples) // 2],
+            "p99": samples[min(int(len(samples) * 0.99), len(samples) - 1)],
+            "max": self.max_lag,
+            "samples": len(samples),
+        }
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self.lag_samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            # The watchdog only sees a lower bound of a stall; fill in how long it really was.
+            if self.stalls and self.stalls[-1]["beat"] == self._last_beat:
+                self.stalls[-1]["duration"] = now - self._last_beat
+            self._last_beat = now
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold or beat == self._sampled_beat:
+                continue
+
+            # Sample each stall once, while the loop thread is still stuck in it.
+            self._sampled_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.extract_stack(frame) if frame else []
+            task = asyncio.current_task(self._loop)
+            stall = {
+                "beat": beat,
+                "duration": blocked,
+                "command": self._command_tasks.get(task) if task else None,
+                "location": self._locate(stack),
+                "stack": "".join(traceback.format_list(stack[-15:])),
+            }
+            self.stalls.append(stall)
+            logger.warning(
+                f"Event loop blocked for {blocked * 1000:.0f} ms in "
+                f"{stall['command'] or 'no command'} at {stall['location']}:\n{stall['stack']}"
+            )
+
+    def _locate(self, stack):
+        for frame in reversed(stack):
+            if frame.filename.startswith(BOT_DIR):
+                return f"{os.path.relpath(frame.filename, BOT_DIR)}:{frame.lineno} in {frame.name}"
+        if stack:
+            return f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}"
+        return "unknown"
+
+
+loop_monitor = LoopMonitor()
@@ -1,6 +1,18 @@
 import youtube_dl
 import asyncio
-import ffmpeg
+import time
+from collections import OrderedDict
+
+from utils.audio_utils import BufferedPCMAudio, get_broadcast_stream
+from utils.config_utils import get_config
+
+config = get_config()
+
+# Bounds how many extractor calls run at once across all guilds.
+extraction_semaphore = asyncio.Semaphore(config['MAX_CONCURRENT_EXTRACTIONS'])
+
+# Song information by URL, least recently used first, as (cached_at, song_info) pairs.
+song_info_cache = OrderedDict()
 
 ytdl_opts = {
     'format': 'bestaudio/best',
@@ -16,27 +28,66 @@ ytdl_opts = {
 }
 
 ffmpeg_options = {
-    'options': '-vn -af "volume=1" -loglevel quiet',
+    'options': '-vn -loglevel quiet',
     'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
 }
 
 async def get_song_info(url):
     """Fetches song information (title, artist, album art) from a given URL.
 
+    Results are kept in an in-process LRU cache for SONG_INFO_CACHE_TTL seconds.
+
     Args:
         url (str): The URL of the song.
 
     Returns:
         dict: A dictionary containing song information.
     """
-    with youtube_dl.YoutubeDL(ytdl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-        return {
-            'title': info.get('title', 'Unknown Title'),
-            'artist': info.get('artist', 'Unknown Artist'),
-            'thumbnail': info.get('thumbnail', 'https://i.imgur.com/gWv3uX0.png'),
-            'url': url,
-        }
+    song_info = get_cached_song_info(url)
+    if song_info is not None:
+        return song_info
+
+    info = await extract_info(url)
+    song_info = {
+        'title': info.get('title', 'Unknown Title'),
+        'artist': info.get('artist', 'Unknown Artist'),
+        'thumbnail': info.get('thumbnail', 'https://i.imgur.com/gWv3uX0.png'),
+        'url': url,
+    }
+    cache_song_info(song_info)
+    return dict(song_info)
+
+def get_cached_song_info(url):
+    """Returns cached song information for a URL, or None if missing or expired.
+
+    Args:
+        url (str): The URL of the song.
+
+    Returns:
+        dict: A copy of the cached song information, or None.
+    """
+    entry = song_info_cache.get(url)
+    if entry is None:
+        return None
+
+    cached_at, song_info = entry
+    if time.monotonic() - cached_at > config['SONG_INFO_CACHE_TTL']:
+        del song_info_cache[url]
+        return None
+
+    song_info_cache.move_to_end(url)
+    return dict(song_info)
+
+def cache_song_info(song_info):
+    """Stores song information in the cache, evicting the least recently used entries.
+
+    Args:
+        song_info (dict): The song information to cache.
+    """
+    song_info_cache[song_info['url']] = (time.monotonic(), song_info)
+    song_info_cache.move_to_end(song_info['url'])
+    while len(song_info_cache) > config['SONG_INFO_CACHE_SIZE']:
+        song_info_cache.popitem(last=False)
 
 async def get_audio_stream(url):
     """Returns an audio stream from a given URL.
@@ -45,22 +96,66 @@ async def get_audio_stream(url):
         url (str): The URL of the song.
 
     Returns:
-        ffmpeg.input: An ffmpeg input object representing the audio stream.
+        BufferedPCMAudio: A read-ahead buffered audio source for the stream.
     """
+    audio_url = await get_stream_url(url)
+    if audio_url:
+        return BufferedPCMAudio(audio_url, **ffmpeg_options)
+    else:
+        return None
+
+async def get_broadcast(url):
+    """Returns the shared broadcast stream for a given URL, starting it if needed.
+
+    Args:
+        url (str): The URL of the song.
+
+    Returns:
+        BroadcastStream: The broadcast to subscribe voice clients to, or None if unavailable.
+    """
+    audio_url = await get_stream_url(url)
+    if audio_url:
+        return get_broadcast_stream(url, audio_url, **ffmpeg_options)
+    else:
+        return None
+
+async def get_stream_url(url):
+    """Resolves the direct audio stream URL for a given song URL.
+
+    Args:
+        url (str): The URL of the song.
+
+    Returns:
+        str: The URL ffmpeg should read the audio from, or None if unavailable.
+    """
+    info = await extract_info(url)
+    return info.get('url')
+
+async def extract_info(url):
+    """Runs the extractor for a given URL off the event loop.
+
+    Extraction is network-bound and blocking, so it runs in an executor, and
+    `extraction_semaphore` caps how many run at once bot-wide.
+
+    Args:
+        url (str): The URL of the song.
+
+    Returns:
+        dict: The extractor's info dictionary.
+    """
+    async with extraction_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(None, _extract_info, url)
+
+def _extract_info(url):
     with youtube_dl.YoutubeDL(ytdl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-        audio_url = info.get('url')
-        if audio_url:
-            return ffmpeg.input(audio_url, **ffmpeg_options)
-        else:
-            return None
+        return ydl.extract_info(url, download=False)
 
 async def play_audio(voice_client, audio_stream):
     """Plays audio from an audio stream.
 
     Args:
         voice_client (discord.VoiceClient): The voice client object.
-        audio_stream (ffmpeg.input): An ffmpeg input object representing the audio stream.
+        audio_stream (discord.AudioSource): The audio source to play.
     """
     if audio_stream:
         voice_client.play(audio_stream, after=lambda e: asyncio.run_coroutine_threadsafe(play_next(voice_client), voice_client.loop).result())
@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import logging
+
+from utils.monitor_utils import loop_monitor
+
+logger = logging.getLogger(__name__)
+
+
+class GuildPlayer:
+    """Playback state for one guild, with a mailbox that serializes changes to it.
+
+    Every state-mutating command for the guild is submitted to the mailbox and
+    run one at a time by a single worker task, so commands for the same guild
+    never interleave while different guilds run fully in parallel. The worker
+    exits once the mailbox is empty, so idle players hold no tasks.
+
+    Args:
+        guild_id (int): The ID of the Discord server.
+    """
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.queue = []
+        self.queue_pages = {}
+        self.current_song = None
+        self.current_source = None
+        self.voice_client = None
+        self.song_loop = False
+        self.volume_level = 1.0
+        # Context of the guild's latest !play, used to announce songs started by callbacks.
+        self.ctx = None
+        self.idle_since = {}
+        self._mailbox = asyncio.Queue()
+        self._worker = None
+
+    async def submit(self, func, *args, **kwargs):
+        """Runs a coroutine function in the mailbox and waits for its result.
+
+        Never call this from a job already running in the same mailbox; call
+        the function directly instead, or the two will wait on each other.
+
+        Args:
+            func: The coroutine function to run.
+            *args: Positional arguments for `func`.
+            **kwargs: Keyword arguments for `func`.
+
+        Returns:
+            The value returned by `func`.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._put(func, args, kwargs, future)
+        return await future
+
+    def post(self, func, *args, **kwargs):
+        """Queues a coroutine function in the mailbox without waiting for it.
+
+        Must be called on the event loop; from other threads use
+        `loop.call_soon_threadsafe(player.post, ...)`.
+        """
+        self._put(func, args, kwargs, None)
+
+    @property
+    def pending(self):
+        """Whether jobs are waiting in the mailbox."""
+        return not self._mailbox.empty()
+
+    def close(self):
+        """Stops the mailbox worker, dropping any jobs still queued."""
+        if self._worker:
+            self._worker.cancel()
+
+    def _put(self, func, args, kwargs, future):
+        self._mailbox.put_nowait((func, args, kwargs, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._mailbox.empty():
+            func, args, kwargs, future = self._mailbox.get_nowait()
+            if future is not None and future.cancelled():
+                continue
+            # Jobs run in this worker task, not the command's, so attribute stalls to the job.
+            loop_monitor.track_task(func.__qualname__)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                if future is None:
+                    logger.error(f"Error in guild {self.guild_id} player job {func.__name__}: {e}")
+                elif not future.done():
+                    future.set_exception(e)
+            else:
+                if future is not None and not future.done():
+                    future.set_result(result)
+            finally:
+                loop_monitor.untrack_task()
+
+
+def serialized(func):
+    """Runs a cog command through the invoking guild's player mailbox.
+
+    The cog must provide `get_player(guild_id)`.
+    """
+    @functools.wraps(func)
+    async def wrapper(self, ctx, *args, **kwargs):
+        return await self.get_player(ctx.guild.id).submit(func, self, ctx, *args, **kwargs)
+    return wrapper
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -21,4 +21,32 @@ class Playlist(Base):
     name = Column(String(255), nullable=False, primary_key=True)
     songs = Column(String, nullable=False)
 
-    server_setting = relationship("ServerSetting", backref="playlists")
\ No newline at end of file
+    server_setting = relationship("ServerSetting", backref="playlists")
+
+class TrackMetadata(Base):
+    __tablename__ = 'track_metadata'
+
+    url = Column(String, primary_key=True)
+    title = Column(String)
+    artist = Column(String)
+    integrated_loudness = Column(Float, nullable=False)
+    true_peak = Column(Float, nullable=False)
+    analyzed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+class PlayHistory(Base):
+    __tablename__ = 'play_history'
+
+    id = Column(BigInteger, primary_key=True)
+    server_id = Column(BigInteger, nullable=False)
+    url = Column(String, nullable=False)
+    title = Column(String)
+    played_at = Column(DateTime, nullable=False, server_default=func.now())
+
+class TrackPlayCount(Base):
+    __tablename__ = 'track_play_counts'
+
+    server_id = Column(BigInteger, primary_key=True)
+    url = Column(String, primary_key=True)
+    title = Column(String)
+    play_count = Column(Integer, nullable=False, default=0)
+    last_played_at = Column(DateTime, nullable=False)
\ No newline at end of file
@@ -14,18 +14,39 @@ CREATE TABLE playlists (
   PRIMARY KEY (server_id, name)
 );
 
--- Insert default server settings for new servers
-CREATE OR REPLACE FUNCTION insert_default_server_settings()
-RETURNS TRIGGER AS $$
-BEGIN
-  IF NEW.server_id NOT IN (SELECT server_id FROM server_settings) THEN
-    INSERT INTO server_settings (server_id) VALUES (NEW.server_id);
-  END IF;
-  RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
-CREATE TRIGGER insert_default_server_settings
-AFTER INSERT ON playlists
-FOR EACH ROW
-EXECUTE PROCEDURE insert_default_server_settings();
\ No newline at end of file
+CREATE TABLE track_metadata (
+  url TEXT PRIMARY KEY,
+  title TEXT,
+  artist TEXT,
+  integrated_loudness REAL NOT NULL,
+  true_peak REAL NOT NULL,
+  analyzed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Append-only log of every song played
+CREATE TABLE play_history (
+  id BIGSERIAL PRIMARY KEY,
+  server_id BIGINT NOT NULL,
+  url TEXT NOT NULL,
+  title TEXT,
+  played_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX play_history_server_played_at ON play_history (server_id, played_at);
+
+-- Per-server play counts, rolled up from play_history as events are written
+CREATE TABLE track_play_counts (
+  server_id BIGINT NOT NULL,
+  url TEXT NOT NULL,
+  title TEXT,
+  play_count INTEGER NOT NULL DEFAULT 0,
+  last_played_at TIMESTAMP NOT NULL,
+  PRIMARY KEY (server_id, url)
+);
+
+CREATE INDEX track_play_counts_top ON track_play_counts (server_id, play_count DESC);
+
+-- Server settings rows are created in bulk by the bot on startup and when it joins a server.
+-- Remove the per-insert trigger that older versions of this schema installed.
+DROP TRIGGER IF EXISTS insert_default_server_settings ON playlists;
+DROP FUNCTION IF EXISTS insert_default_server_settings();
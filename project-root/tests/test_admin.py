@@ -1,7 +1,8 @@
+import asyncio
 import pytest
 import discord
 from discord.ext import commands
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from bot.cogs.admin import AdminCog
 from utils.config_utils import load_config
 from utils.database_utils import get_server_settings, update_server_settings
@@ -55,13 +56,35 @@ def test_remove_source(mock_update_server_settings, mock_get_server_settings, bo
     mock_update_server_settings.assert_called_once_with(ctx.guild.id, {'ALLOWED_SOURCES': ['youtube', 'soundcloud']})
     assert ctx.send.call_args[0][0] == "Music source `spotify` removed."
 
-@patch('utils.database_utils.get_playlists')
-def test_view_playlists(mock_get_playlists, bot, ctx):
-    mock_get_playlists.return_value = [{'name': 'playlist1'}, {'name': 'playlist2'}]
+@patch('utils.database_utils.get_playlist_names')
+def test_view_playlists(mock_get_playlist_names, bot, ctx):
+    mock_get_playlist_names.return_value = ['playlist1', 'playlist2']
     bot.get_cog('AdminCog').view_playlists(ctx)
-    mock_get_playlists.assert_called_once_with(ctx.guild.id)
+    mock_get_playlist_names.assert_called_once_with(ctx.guild.id, after=None, limit=21)
     assert ctx.send.call_args[0][0] == "Available playlists: playlist1, playlist2"
 
+@patch('utils.database_utils.get_playlist_names')
+def test_view_playlists_second_page(mock_get_playlist_names, bot, ctx):
+    first_page = [f'playlist{i:02}' for i in range(21)]
+    mock_get_playlist_names.side_effect = [first_page, ['playlist20']]
+    bot.get_cog('AdminCog').view_playlists(ctx, 2)
+    mock_get_playlist_names.assert_called_with(ctx.guild.id, after='playlist19', limit=21)
+    assert ctx.send.call_args[0][0] == "Available playlists: playlist20 (page 2)"
+
+@patch('utils.database_utils.get_playlist_names')
+def test_view_playlists_uses_cached_page(mock_get_playlist_names, bot, ctx):
+    mock_get_playlist_names.return_value = ['playlist1']
+    bot.get_cog('AdminCog').view_playlists(ctx)
+    bot.get_cog('AdminCog').view_playlists(ctx)
+    mock_get_playlist_names.assert_called_once()
+
+@patch('utils.database_utils.get_playlist_names')
+def test_view_playlists_truncates_long_names(mock_get_playlist_names, bot, ctx):
+    mock_get_playlist_names.return_value = ['x' * 255 for _ in range(21)]
+    bot.get_cog('AdminCog').view_playlists(ctx)
+    assert 'x' * 81 not in ctx.send.call_args[0][0]
+    assert len(ctx.send.call_args[0][0]) <= 2000
+
 @patch('utils.database_utils.create_playlist')
 def test_create_playlist(mock_create_playlist, bot, ctx):
     bot.get_cog('AdminCog').create_playlist(ctx, 'new_playlist')
@@ -84,4 +107,37 @@ def test_remove_from_playlist(mock_remove_from_playlist, bot, ctx):
 def test_delete_playlist(mock_delete_playlist, bot, ctx):
     bot.get_cog('AdminCog').delete_playlist(ctx, 'playlist_name')
     mock_delete_playlist.assert_called_once_with(ctx.guild.id, 'playlist_name')
-    assert ctx.send.call_args[0][0] == "Playlist `playlist_name` deleted."
\ No newline at end of file
+    assert ctx.send.call_args[0][0] == "Playlist `playlist_name` deleted."
+
+@patch('bot.cogs.admin.get_buffer_stats')
+@patch('bot.cogs.admin.loop_monitor')
+def test_loop_stats(mock_loop_monitor, mock_get_buffer_stats, bot, ctx):
+    mock_loop_monitor.get_stats.return_value = {'p50': 0.001, 'p99': 0.05, 'max': 0.8, 'samples': 600}
+    mock_get_buffer_stats.return_value = {'frames': 15000, 'underruns': 30}
+    mock_loop_monitor.stalls = [{'duration': 0.8, 'command': 'MusicCog.play', 'location': 'utils/music_utils.py:120 in _extract_info'}]
+    bot.get_cog('AdminCog').loop_stats(ctx)
+    assert ctx.send.call_args[0][0] == (
+        "```\n"
+        "Loop lag over 600 samples: p50 1.0 ms, p99 50.0 ms, max 800.0 ms\n"
+        "Audio buffer underruns: 30 in 15000 frames (0.20%)\n"
+        "Recent stalls:\n"
+        "800 ms in MusicCog.play at utils/music_utils.py:120 in _extract_info\n"
+        "```"
+    )
+
+@patch('bot.cogs.admin.update_server_settings')
+@patch('bot.cogs.admin.get_server_settings', return_value=None)
+def test_settings_commands_with_unavailable_settings(mock_get_server_settings, mock_update_server_settings):
+    cog = AdminCog(MagicMock())
+    ctx = MagicMock(send=AsyncMock())
+
+    async def main():
+        await cog.set_prefix(ctx, '>')
+        await cog.set_default_source(ctx, 'youtube')
+        await cog.add_source(ctx, 'spotify')
+        await cog.remove_source(ctx, 'spotify')
+
+    asyncio.run(main())
+    mock_update_server_settings.assert_not_called()
+    assert ctx.send.call_count == 4
+    assert ctx.send.call_args[0][0] == "Server settings are unavailable right now. Please try again later."
@@ -0,0 +1,171 @@
+import io
+import queue
+import threading
+import time
+import pytest
+import discord
+import numpy as np
+from unittest.mock import patch
+from utils.audio_utils import BufferedPCMAudio, FRAME_SIZE, get_broadcast_stream, get_buffer_stats, _broadcasts
+from utils.filter_utils import GainFilter, SAMPLES_PER_FRAME, CHANNELS
+from utils.loudness_utils import get_normalization_gain
+
+def make_frame(value):
+    return np.full(SAMPLES_PER_FRAME * CHANNELS, value, dtype=np.int16)
+
+class ChunkedStdout:
+    """A stand-in for ffmpeg's stdout that hands out queued chunks, blocking until one arrives."""
+
+    def __init__(self):
+        self.chunks = queue.Queue()
+
+    def readinto(self, buffer):
+        chunk = self.chunks.get()
+        if chunk is None:
+            return 0
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+class FakeOpusAudio:
+    """A stand-in for ffmpeg's Opus output that produces numbered frames once started."""
+
+    frame_count = 20
+
+    def __init__(self, source, **kwargs):
+        self.started = threading.Event()
+        self.frames = [bytes([i]) for i in range(self.frame_count)]
+        self.cleaned_up = False
+
+    def read(self):
+        self.started.wait()
+        return self.frames.pop(0) if self.frames else b''
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+@pytest.fixture
+def broadcast():
+    with patch.object(discord, 'FFmpegOpusAudio', FakeOpusAudio), patch.dict(_broadcasts, clear=True):
+        yield get_broadcast_stream('song_url', 'audio_url')
+
+@pytest.fixture
+def make_source():
+    def make_source(stdout, capacity=10, prebuffer=1):
+        def init(self, source, **kwargs):
+            self._stdout = stdout
+        with patch.object(discord.FFmpegPCMAudio, '__init__', init):
+            return BufferedPCMAudio('song.mp3', capacity=capacity, prebuffer=prebuffer)
+    return make_source
+
+def test_gain_filter_volume_is_instant():
+    gain_filter = GainFilter()
+    gain_filter.volume = 0.5
+    frame = make_frame(1000)
+    gain_filter.apply(frame)
+    assert (frame == 500).all()
+
+def test_gain_filter_fade_reaches_target():
+    gain_filter = GainFilter()
+    gain_filter.fade(0.0, 0.1)
+    assert gain_filter.volume == 0.0
+    frame = make_frame(1000)
+    gain_filter.apply(frame)
+    assert frame[0] == 1000
+    assert (np.diff(frame) <= 0).all()
+    assert frame[-1] < 1000
+    for _ in range(4):
+        gain_filter.apply(make_frame(1000))
+    frame = make_frame(1000)
+    gain_filter.apply(frame)
+    assert (frame == 0).all()
+
+def test_gain_filter_clips():
+    gain_filter = GainFilter(gain=2.0)
+    frame = make_frame(30000)
+    frame[::2] = -30000
+    gain_filter.apply(frame)
+    assert (frame[::2] == -32768).all()
+    assert (frame[1::2] == 32767).all()
+
+def test_gain_filter_bypasses_unity_gain():
+    # A read-only frame would fail to be written to, so this only passes if the frame is left alone.
+    frame = make_frame(1000).tobytes()
+    GainFilter().apply(frame)
+    assert frame == make_frame(1000).tobytes()
+
+def test_buffered_audio_reads_until_eof(make_source):
+    frames = [bytes([i]) * FRAME_SIZE for i in range(3)]
+    source = make_source(io.BytesIO(b''.join(frames)))
+    source._reader.join()
+    assert [bytes(source.read()) for _ in range(3)] == frames
+    assert source.read() == b''
+    assert source.frames_played == 3
+    assert source.underruns == 0
+
+def test_buffered_audio_drops_partial_trailing_frame(make_source):
+    frames = [bytes([i]) * FRAME_SIZE for i in range(2)]
+    source = make_source(io.BytesIO(b''.join(frames) + b'\x07' * 100))
+    source._reader.join()
+    assert [bytes(source.read()) for _ in range(2)] == frames
+    assert source.read() == b''
+
+def test_buffered_audio_counts_underruns(make_source):
+    stdout = ChunkedStdout()
+    stdout.chunks.put(b'\x01' * FRAME_SIZE)
+    source = make_source(stdout)
+    underruns = get_buffer_stats()['underruns']
+    assert bytes(source.read()) == b'\x01' * FRAME_SIZE
+    assert source.underruns == 0
+
+    threading.Timer(0.05, stdout.chunks.put, [b'\x02' * FRAME_SIZE]).start()
+    assert bytes(source.read()) == b'\x02' * FRAME_SIZE
+    assert source.underruns == 1
+    assert get_buffer_stats()['underruns'] == underruns + 1
+
+    stdout.chunks.put(None)
+    source._reader.join()
+    assert source.read() == b''
+    assert source.underruns == 1
+
+def test_normalization_gain_is_capped():
+    assert get_normalization_gain({'integrated_loudness': -16.0, 'true_peak': -1.0}) == 1.0
+    assert get_normalization_gain({'integrated_loudness': -60.0, 'true_peak': -40.0}) == pytest.approx(10 ** (12 / 20))
+    assert get_normalization_gain({'integrated_loudness': -20.0, 'true_peak': 0.0}) == pytest.approx(10 ** (-1 / 20))
+
+def test_normalization_gain_of_silent_track():
+    assert get_normalization_gain({'integrated_loudness': float('-inf'), 'true_peak': float('-inf')}) == 1.0
+
+def test_broadcast_is_not_held_back_by_paused_listener(broadcast):
+    broadcast.capacity = 5
+    broadcast._frames = [None] * 5
+    paused = broadcast.subscribe()
+    playing = broadcast.subscribe()
+    broadcast._source.started.set()
+
+    started = time.monotonic()
+    frames = [playing.read() for _ in range(20)]
+    assert time.monotonic() - started < 1
+    assert frames == [bytes([i]) for i in range(20)]
+    assert playing.read() == b''
+
+    # The paused listener resumes at the oldest frame still buffered.
+    assert [paused.read() for _ in range(5)] == [bytes([i]) for i in range(15, 20)]
+    assert paused.read() == b''
+
+def test_broadcast_is_forgotten_once_finished(broadcast):
+    listener = broadcast.subscribe()
+    broadcast._source.started.set()
+    while listener.read():
+        pass
+    broadcast._thread.join()
+    assert broadcast._source.cleaned_up
+    assert 'song_url' not in _broadcasts
+    assert get_broadcast_stream('song_url', 'audio_url') is not broadcast
+
+def test_broadcast_stops_when_last_listener_leaves(broadcast):
+    listener = broadcast.subscribe()
+    listener.cleanup()
+    broadcast._source.started.set()
+    broadcast._thread.join()
+    assert broadcast.finished
+    assert 'song_url' not in _broadcasts
@@ -0,0 +1,81 @@
+import datetime
+import pytest
+import psycopg2
+from unittest.mock import patch, MagicMock
+from utils.database_utils import ensure_server_settings, get_server_settings, insert_play_events, server_settings_cache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    with patch.dict(server_settings_cache, clear=True):
+        yield
+
+@pytest.fixture
+def connection():
+    connection = MagicMock()
+    connection.cursor.return_value.fetchall.return_value = [(1234567890, '!', 'youtube', 'youtube,spotify')]
+    return connection
+
+@patch('utils.database_utils.execute_values')
+@patch('utils.database_utils.connect_to_database')
+def test_get_server_settings_on_cache_miss(mock_connect_to_database, mock_execute_values, connection):
+    mock_connect_to_database.return_value = connection
+    server_settings = get_server_settings(1234567890)
+    assert server_settings == {'DEFAULT_PREFIX': '!', 'DEFAULT_SOURCE': 'youtube', 'ALLOWED_SOURCES': ['youtube', 'spotify']}
+    assert mock_execute_values.call_args[0][2] == [(1234567890,)]
+    connection.commit.assert_called_once()
+    connection.close.assert_called_once()
+
+@patch('utils.database_utils.execute_values')
+@patch('utils.database_utils.connect_to_database')
+def test_get_server_settings_serves_cached_copies(mock_connect_to_database, mock_execute_values, connection):
+    mock_connect_to_database.return_value = connection
+    get_server_settings(1234567890)['ALLOWED_SOURCES'].append('soundcloud')
+    assert get_server_settings(1234567890)['ALLOWED_SOURCES'] == ['youtube', 'spotify']
+    mock_connect_to_database.assert_called_once()
+
+@patch('utils.database_utils.execute_values')
+@patch('utils.database_utils.connect_to_database')
+def test_ensure_server_settings_batches_inserts(mock_connect_to_database, mock_execute_values, connection):
+    mock_connect_to_database.return_value = connection
+    ensure_server_settings([1, 2, 3], batch_size=2)
+    assert mock_execute_values.call_args[0][2] == [(1,), (2,), (3,)]
+    assert mock_execute_values.call_args[1]['page_size'] == 2
+    assert connection.cursor.return_value.execute.call_args[0][1] == ([1, 2, 3],)
+
+@patch('utils.database_utils.execute_values')
+@patch('utils.database_utils.connect_to_database')
+def test_ensure_server_settings_with_database_error(mock_connect_to_database, mock_execute_values, connection):
+    mock_connect_to_database.return_value = connection
+    mock_execute_values.side_effect = psycopg2.OperationalError('Connection lost')
+    assert ensure_server_settings([1234567890]) == {}
+    connection.rollback.assert_called_once()
+    assert server_settings_cache == {}
+    assert get_server_settings(1234567890) is None
+
+@patch('utils.database_utils.connect_to_database')
+def test_get_server_settings_with_unreachable_database(mock_connect_to_database):
+    mock_connect_to_database.return_value = None
+    assert ensure_server_settings([1234567890]) == {}
+    assert get_server_settings(1234567890) is None
+
+@patch('utils.database_utils.connect_to_database')
+def test_ensure_server_settings_with_no_servers(mock_connect_to_database):
+    assert ensure_server_settings([]) == {}
+    mock_connect_to_database.assert_not_called()
+
+@patch('utils.database_utils.execute_values')
+@patch('utils.database_utils.connect_to_database')
+def test_insert_play_events_drops_invalid_batch(mock_connect_to_database, mock_execute_values, connection):
+    mock_connect_to_database.return_value = connection
+    mock_execute_values.side_effect = psycopg2.DataError('value too long')
+    events = [{'server_id': 1234567890, 'url': 'url1', 'title': 'Song 1', 'played_at': datetime.datetime(2023, 1, 1)}]
+    assert insert_play_events(events) is True
+    connection.rollback.assert_called_once()
+
+@patch('utils.database_utils.execute_values')
+@patch('utils.database_utils.connect_to_database')
+def test_insert_play_events_retries_after_connection_error(mock_connect_to_database, mock_execute_values, connection):
+    mock_connect_to_database.return_value = connection
+    mock_execute_values.side_effect = psycopg2.OperationalError('Connection lost')
+    events = [{'server_id': 1234567890, 'url': 'url1', 'title': 'Song 1', 'played_at': datetime.datetime(2023, 1, 1)}]
+    assert insert_play_events(events) is False
@@ -4,6 +4,7 @@ from discord.ext import commands
 from unittest.mock import patch, MagicMock
 from bot.cogs.music import MusicCog
 from utils.music_utils import get_song_info, get_audio_stream, play_audio, stop_audio
+from utils.audio_utils import BufferedPCMAudio
 
 @pytest.fixture
 def bot():
@@ -26,12 +27,12 @@ def test_play(mock_get_song_info, bot, ctx):
     assert ctx.send.call_args[0][0] == 'Added Song Title to the queue.'
 
 @patch('utils.music_utils.get_song_info')
-@patch('bot.cogs.music.MusicCog.join')
-def test_play_with_no_voice_client(mock_join, mock_get_song_info, bot, ctx):
+@patch('bot.cogs.music.MusicCog.connect')
+def test_play_with_no_voice_client(mock_connect, mock_get_song_info, bot, ctx):
     mock_get_song_info.return_value = {'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
-    bot.get_cog('MusicCog').voice_client = None
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = None
     bot.get_cog('MusicCog').play(ctx, 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')
-    mock_join.assert_called_once_with(ctx)
+    mock_connect.assert_called_once_with(ctx, bot.get_cog('MusicCog').get_player(ctx.guild.id))
     mock_get_song_info.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
     assert ctx.send.call_args_list[1][0][0] == 'Added Song Title to the queue.'
 
@@ -39,137 +40,195 @@ def test_play_with_no_voice_client(mock_join, mock_get_song_info, bot, ctx):
 @patch('bot.cogs.music.MusicCog.play_next')
 def test_play_with_empty_queue(mock_play_next, mock_get_song_info, bot, ctx):
     mock_get_song_info.return_value = {'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
-    bot.get_cog('MusicCog').queue = []
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = []
     bot.get_cog('MusicCog').play(ctx, 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')
     mock_get_song_info.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
-    mock_play_next.assert_called_once_with(ctx)
+    mock_play_next.assert_called_once_with(ctx, bot.get_cog('MusicCog').get_player(ctx.guild.id))
     assert ctx.send.call_args_list[1][0][0] == 'Added Song Title to the queue.'
 
 @patch('utils.music_utils.get_audio_stream')
 @patch('bot.cogs.music.MusicCog.play_next')
 def test_play_next(mock_play_next, mock_get_audio_stream, bot, ctx):
-    bot.get_cog('MusicCog').queue = [{'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
-    bot.get_cog('MusicCog').voice_client = MagicMock()
-    bot.get_cog('MusicCog').play_next(ctx)
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock()
+    bot.get_cog('MusicCog').play_next(ctx, bot.get_cog('MusicCog').get_player(ctx.guild.id))
     mock_get_audio_stream.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
     mock_play_next.assert_not_called()
-    bot.get_cog('MusicCog').voice_client.play.assert_called_once()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.play.assert_called_once()
     assert ctx.send.call_args[0][0] == 'Now playing: Song Title by Artist Name'
 
 @patch('utils.music_utils.get_audio_stream')
 @patch('bot.cogs.music.MusicCog.play_next')
 def test_play_next_with_download_error(mock_play_next, mock_get_audio_stream, bot, ctx):
     mock_get_audio_stream.side_effect = youtube_dl.utils.DownloadError('Download Error')
-    bot.get_cog('MusicCog').queue = [{'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
-    bot.get_cog('MusicCog').voice_client = MagicMock()
-    bot.get_cog('MusicCog').play_next(ctx)
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock()
+    bot.get_cog('MusicCog').play_next(ctx, bot.get_cog('MusicCog').get_player(ctx.guild.id))
     mock_get_audio_stream.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
-    mock_play_next.assert_called_once_with(ctx)
+    mock_play_next.assert_called_once_with(ctx, bot.get_cog('MusicCog').get_player(ctx.guild.id))
     assert ctx.send.call_args[0][0] == 'Error: Could not download Song Title. Skipping.'
 
 @patch('utils.music_utils.get_audio_stream')
+def test_play_next_with_failed_play(mock_get_audio_stream, bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.queue = [{'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
+    player.voice_client = MagicMock(play=MagicMock(side_effect=discord.ClientException('Not connected to voice.')))
+    bot.get_cog('MusicCog').play_next(ctx, player)
+    mock_get_audio_stream.return_value.cleanup.assert_called_once()
+    assert player.current_song is None
+    assert player.current_source is None
+    assert ctx.send.call_args[0][0] == 'Error: Could not play Song Title.'
+
 @patch('bot.cogs.music.MusicCog.play_next')
-def test_play_next_with_song_loop(mock_play_next, mock_get_audio_stream, bot, ctx):
-    mock_get_audio_stream.return_value = MagicMock()
-    bot.get_cog('MusicCog').queue = [{'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
-    bot.get_cog('MusicCog').voice_client = MagicMock()
-    bot.get_cog('MusicCog').song_loop = True
-    bot.get_cog('MusicCog').play_next(ctx)
-    mock_get_audio_stream.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
-    mock_play_next.assert_called_once_with(ctx)
-    bot.get_cog('MusicCog').voice_client.play.assert_called_once()
-    assert ctx.send.call_args_list[1][0][0] == 'Now playing: Song Title by Artist Name'
+def test_song_finished_with_song_loop(mock_play_next, bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    song = {'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
+    source = MagicMock()
+    player.current_song = song
+    player.current_source = source
+    player.song_loop = True
+    bot.get_cog('MusicCog').song_finished(ctx, player, source)
+    assert player.queue == [song]
+    mock_play_next.assert_called_once_with(ctx, player)
+
+@patch('bot.cogs.music.MusicCog.play_next')
+def test_song_finished_ignores_replaced_source(mock_play_next, bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.current_source = MagicMock()
+    bot.get_cog('MusicCog').song_finished(ctx, player, MagicMock())
+    mock_play_next.assert_not_called()
+
+def test_players_are_per_guild(bot):
+    assert bot.get_cog('MusicCog').get_player(1) is bot.get_cog('MusicCog').get_player(1)
+    assert bot.get_cog('MusicCog').get_player(1) is not bot.get_cog('MusicCog').get_player(2)
 
 def test_pause(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(is_playing=MagicMock(return_value=True))
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(is_playing=MagicMock(return_value=True))
     bot.get_cog('MusicCog').pause(ctx)
-    bot.get_cog('MusicCog').voice_client.pause.assert_called_once()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.pause.assert_called_once()
     assert ctx.send.call_args[0][0] == 'Paused.'
 
 def test_pause_with_no_song_playing(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(is_playing=MagicMock(return_value=False))
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(is_playing=MagicMock(return_value=False))
     bot.get_cog('MusicCog').pause(ctx)
-    bot.get_cog('MusicCog').voice_client.pause.assert_not_called()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.pause.assert_not_called()
     assert ctx.send.call_args[0][0] == 'No song is playing.'
 
 def test_resume(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(is_paused=MagicMock(return_value=True))
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(is_paused=MagicMock(return_value=True))
     bot.get_cog('MusicCog').resume(ctx)
-    bot.get_cog('MusicCog').voice_client.resume.assert_called_once()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.resume.assert_called_once()
     assert ctx.send.call_args[0][0] == 'Resumed.'
 
 def test_resume_with_no_song_paused(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(is_paused=MagicMock(return_value=False))
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(is_paused=MagicMock(return_value=False))
     bot.get_cog('MusicCog').resume(ctx)
-    bot.get_cog('MusicCog').voice_client.resume.assert_not_called()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.resume.assert_not_called()
     assert ctx.send.call_args[0][0] == 'No song is paused.'
 
 def test_stop(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock()
     bot.get_cog('MusicCog').stop(ctx)
-    bot.get_cog('MusicCog').voice_client.stop.assert_called_once()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.stop.assert_called_once()
     assert ctx.send.call_args[0][0] == 'Stopped.'
 
 def test_stop_with_no_voice_client(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = None
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = None
     bot.get_cog('MusicCog').stop(ctx)
     assert ctx.send.call_args[0][0] == 'I am not in a voice channel.'
 
-def test_skip(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(is_playing=MagicMock(return_value=True))
+@patch('bot.cogs.music.MusicCog.play_next')
+def test_skip(mock_play_next, bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(is_playing=MagicMock(return_value=True))
     bot.get_cog('MusicCog').skip(ctx)
-    bot.get_cog('MusicCog').voice_client.stop.assert_called_once()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.stop.assert_called_once()
+    mock_play_next.assert_not_called()
     assert ctx.send.call_args[0][0] == 'Skipped.'
 
 def test_skip_with_no_song_playing(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(is_playing=MagicMock(return_value=False))
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(is_playing=MagicMock(return_value=False))
     bot.get_cog('MusicCog').skip(ctx)
-    bot.get_cog('MusicCog').voice_client.stop.assert_not_called()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.stop.assert_not_called()
     assert ctx.send.call_args[0][0] == 'No song is playing.'
 
 def test_queue(bot, ctx):
-    bot.get_cog('MusicCog').queue = [{'title': 'Song 1'}, {'title': 'Song 2'}]
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': 'Song 1'}, {'title': 'Song 2'}]
     bot.get_cog('MusicCog').queue(ctx)
     assert ctx.send.call_args[0][0] == '```\n1. Song 1\n2. Song 2\n```'
 
+def test_queue_second_page(bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': f'Song {i}'} for i in range(1, 13)]
+    bot.get_cog('MusicCog').queue(ctx, 2)
+    assert ctx.send.call_args[0][0] == '```\n11. Song 11\n12. Song 12\nPage 2/2\n```'
+
+def test_queue_with_invalid_page(bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': 'Song 1'}]
+    bot.get_cog('MusicCog').queue(ctx, 3)
+    assert ctx.send.call_args[0][0] == 'Page must be between 1 and 1.'
+
 def test_queue_with_empty_queue(bot, ctx):
-    bot.get_cog('MusicCog').queue = []
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = []
     bot.get_cog('MusicCog').queue(ctx)
     assert ctx.send.call_args[0][0] == 'The queue is empty.'
 
 def test_clear(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock()
-    bot.get_cog('MusicCog').queue = [{'title': 'Song 1'}, {'title': 'Song 2'}]
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock()
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': 'Song 1'}, {'title': 'Song 2'}]
     bot.get_cog('MusicCog').clear(ctx)
-    assert bot.get_cog('MusicCog').queue == []
+    assert bot.get_cog('MusicCog').get_player(ctx.guild.id).queue == []
     assert ctx.send.call_args[0][0] == 'Cleared the queue.'
 
 def test_clear_with_no_voice_client(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = None
-    bot.get_cog('MusicCog').queue = [{'title': 'Song 1'}, {'title': 'Song 2'}]
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = None
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).queue = [{'title': 'Song 1'}, {'title': 'Song 2'}]
     bot.get_cog('MusicCog').clear(ctx)
     assert ctx.send.call_args[0][0] == 'I am not in a voice channel.'
 
 def test_volume(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(source=MagicMock())
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(source=MagicMock(spec=BufferedPCMAudio))
     bot.get_cog('MusicCog').volume(ctx, 50)
-    assert bot.get_cog('MusicCog').voice_client.source.volume == 0.5
+    assert bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.source.volume == 0.5
     assert ctx.send.call_args[0][0] == 'Volume set to 50%.'
 
 def test_volume_with_invalid_volume(bot, ctx):
-    bot.get_cog('MusicCog').voice_client = MagicMock(source=MagicMock())
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(source=MagicMock(spec=BufferedPCMAudio))
     bot.get_cog('MusicCog').volume(ctx, 150)
     assert ctx.send.call_args[0][0] == 'Volume must be between 0 and 100.'
 
+def test_volume_during_broadcast(bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(source=MagicMock())
+    bot.get_cog('MusicCog').volume(ctx, 50)
+    assert bot.get_cog('MusicCog').get_player(ctx.guild.id).volume_level == 1.0
+    assert ctx.send.call_args[0][0] == 'Volume cannot be changed during a broadcast.'
+
+def test_fade(bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(source=MagicMock(spec=BufferedPCMAudio, filter=MagicMock()))
+    bot.get_cog('MusicCog').fade(ctx, 20, 3)
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.source.filter.fade.assert_called_once_with(0.2, 3)
+    assert bot.get_cog('MusicCog').get_player(ctx.guild.id).volume_level == 0.2
+    assert ctx.send.call_args[0][0] == 'Fading volume to 20% over 3 seconds.'
+
+def test_fade_with_invalid_volume(bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(source=MagicMock(spec=BufferedPCMAudio, filter=MagicMock()))
+    bot.get_cog('MusicCog').fade(ctx, 150, 3)
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.source.filter.fade.assert_not_called()
+    assert ctx.send.call_args[0][0] == 'Volume must be between 0 and 100.'
+
+def test_fade_during_broadcast(bot, ctx):
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client = MagicMock(source=MagicMock())
+    bot.get_cog('MusicCog').fade(ctx, 20, 3)
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).voice_client.source.filter.fade.assert_not_called()
+    assert ctx.send.call_args[0][0] == 'Volume cannot be changed during a broadcast.'
+
 def test_loop_on(bot, ctx):
     bot.get_cog('MusicCog').loop(ctx, 'on')
-    assert bot.get_cog('MusicCog').song_loop is True
+    assert bot.get_cog('MusicCog').get_player(ctx.guild.id).song_loop is True
     assert ctx.send.call_args[0][0] == 'Song loop enabled.'
 
 def test_loop_off(bot, ctx):
-    bot.get_cog('MusicCog').song_loop = True
+    bot.get_cog('MusicCog').get_player(ctx.guild.id).song_loop = True
     bot.get_cog('MusicCog').loop(ctx, 'off')
-    assert bot.get_cog('MusicCog').song_loop is False
+    assert bot.get_cog('MusicCog').get_player(ctx.guild.id).song_loop is False
     assert ctx.send.call_args[0][0] == 'Song loop disabled.'
 
 def test_loop_invalid_mode(bot, ctx):
@@ -179,4 +238,101 @@ def test_loop_invalid_mode(bot, ctx):
 def test_cog_command_error(bot, ctx):
     error = Exception('Test Error')
     bot.get_cog('MusicCog').cog_command_error(ctx, error)
-    assert ctx.send.call_args[0][0] == f'An error occurred: {error}'
\ No newline at end of file
+    assert ctx.send.call_args[0][0] == f'An error occurred: {error}'
+
+def test_cog_command_error_with_check_failure(bot, ctx):
+    error = commands.NotOwner('You do not own this bot.')
+    bot.get_cog('MusicCog').cog_command_error(ctx, error)
+    assert ctx.send.call_args[0][0] == 'You do not own this bot.'
+
+@patch('bot.cogs.music.get_broadcast')
+@patch('bot.cogs.music.get_song_info')
+def test_broadcast(mock_get_song_info, mock_get_broadcast, bot, ctx):
+    mock_get_song_info.return_value = {'title': 'Song Title', 'artist': 'Artist Name', 'thumbnail': 'https://i.imgur.com/gWv3uX0.png', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
+    players = [bot.get_cog('MusicCog').get_player(guild_id) for guild_id in range(3)]
+    for player in players:
+        player.voice_client = MagicMock(is_playing=MagicMock(return_value=False), is_paused=MagicMock(return_value=False))
+    bot.get_cog('MusicCog').broadcast(ctx, 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+    mock_get_broadcast.assert_called_once_with('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+    assert mock_get_broadcast.return_value.subscribe.call_count == 3
+    for player in players:
+        player.voice_client.play.assert_called_once()
+        assert player.current_source is mock_get_broadcast.return_value.subscribe.return_value
+        assert player.current_song['title'] == 'Song Title'
+    assert ctx.send.call_args[0][0] == 'Broadcasting Song Title to 3 voice channels.'
+
+def test_broadcast_with_no_idle_voice_clients(bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.voice_client = MagicMock(is_playing=MagicMock(return_value=True))
+    player.current_song = {'title': 'Song Title', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
+    bot.get_cog('MusicCog').broadcast(ctx, 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+    player.voice_client.play.assert_not_called()
+    assert ctx.send.call_args[0][0] == 'I am not in any idle voice channels.'
+
+@patch('bot.cogs.music.MusicCog.play_next')
+def test_broadcast_finished_plays_queued_songs(mock_play_next, bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    source = MagicMock()
+    player.current_song = {'title': 'Song Title', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
+    player.current_source = source
+    player.queue = [{'title': 'Next Song', 'url': 'https://www.youtube.com/watch?v=oHg5SJYRHA0'}]
+    player.ctx = ctx
+    bot.get_cog('MusicCog').broadcast_finished(player, source)
+    assert player.current_song is None
+    mock_play_next.assert_called_once_with(ctx, player)
+
+def test_idle_reason_with_empty_queue(bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.voice_client = MagicMock(is_playing=MagicMock(return_value=False), is_paused=MagicMock(return_value=False))
+    player.voice_client.channel.members = [MagicMock(bot=False)]
+    assert bot.get_cog('MusicCog').idle_reason(player, 0) is None
+    assert bot.get_cog('MusicCog').idle_reason(player, 10 ** 6) == 'nothing to play'
+
+def test_idle_reason_while_playing(bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.voice_client = MagicMock(is_playing=MagicMock(return_value=True), is_paused=MagicMock(return_value=False))
+    player.voice_client.channel.members = [MagicMock(bot=False)]
+    bot.get_cog('MusicCog').idle_reason(player, 0)
+    assert bot.get_cog('MusicCog').idle_reason(player, 10 ** 6) is None
+
+def test_idle_reason_while_disconnected(bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.voice_client = MagicMock(is_connected=MagicMock(return_value=False))
+    player.queue = [{'title': 'Song Title', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}]
+    player.current_source = MagicMock()
+    assert bot.get_cog('MusicCog').idle_reason(player, 0) is None
+    assert bot.get_cog('MusicCog').idle_reason(player, 10 ** 6) == 'disconnected'
+
+def test_idle_reason_after_reconnect(bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    player.voice_client = MagicMock(is_connected=MagicMock(return_value=False))
+    assert bot.get_cog('MusicCog').idle_reason(player, 0) is None
+    player.voice_client = MagicMock(is_playing=MagicMock(return_value=True), is_paused=MagicMock(return_value=False))
+    player.voice_client.channel.members = [MagicMock(bot=False)]
+    assert bot.get_cog('MusicCog').idle_reason(player, 10 ** 6) is None
+    assert 'disconnected' not in player.idle_since
+
+def test_reap(bot, ctx):
+    player = bot.get_cog('MusicCog').get_player(ctx.guild.id)
+    voice_client = MagicMock(is_connected=MagicMock(return_value=False))
+    player.voice_client = voice_client
+    player.current_source = MagicMock()
+    player.idle_since['disconnected'] = -10 ** 6
+    bot.get_cog('MusicCog').reap(ctx.guild.id, player, 'disconnected')
+    voice_client.stop.assert_called_once()
+    voice_client.disconnect.assert_called_once_with(force=True)
+    assert player.current_source is None
+    assert ctx.guild.id not in bot.get_cog('MusicCog').players
+
+@patch('bot.cogs.music.get_top_tracks')
+def test_top_tracks(mock_get_top_tracks, bot, ctx):
+    mock_get_top_tracks.return_value = [{'url': 'url1', 'title': 'Song 1', 'play_count': 12}, {'url': 'url2', 'title': 'Song 2', 'play_count': 3}]
+    bot.get_cog('MusicCog').top_tracks(ctx)
+    mock_get_top_tracks.assert_called_once_with(ctx.guild.id)
+    assert ctx.send.call_args[0][0] == '```\n1. Song 1 (12 plays)\n2. Song 2 (3 plays)\n```'
+
+@patch('bot.cogs.music.get_top_tracks')
+def test_top_tracks_with_no_history(mock_get_top_tracks, bot, ctx):
+    mock_get_top_tracks.return_value = []
+    bot.get_cog('MusicCog').top_tracks(ctx)
+    assert ctx.send.call_args[0][0] == 'No songs have been played yet.'
@@ -0,0 +1,294 @@
+import asyncio
+import pytest
+import discord
+from unittest.mock import patch, MagicMock, AsyncMock
+from bot.cogs.music import MusicCog
+from utils.player_utils import GuildPlayer
+
+SONGS = [
+    {'title': f'Song {i}', 'artist': 'Artist Name', 'url': f'https://www.youtube.com/watch?v={i}'}
+    for i in range(3)
+]
+
+class FakeVoiceClient:
+    """Plays nothing, but calls `after` when stopped the way discord's audio player does."""
+
+    def __init__(self):
+        self.source = None
+        self.after = None
+        self.played = []
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def is_playing(self):
+        return self.source is not None
+
+    def is_paused(self):
+        return False
+
+    def play(self, source, after=None):
+        if self.source is not None:
+            raise discord.ClientException('Already playing audio.')
+        self.source = source
+        self.after = after
+        self.played.append(source)
+
+    def stop(self):
+        after, self.source, self.after = self.after, None, None
+        if after:
+            after(None)
+
+    async def disconnect(self, force=False):
+        self.connected = False
+
+async def drain(player):
+    """Waits for callbacks posted from `after` and every job queued before them."""
+    await asyncio.sleep(0)
+    await player.submit(asyncio.sleep, 0)
+
+@pytest.fixture
+def cog():
+    cog = MusicCog(MagicMock())
+    cog.loudness_analyzer = MagicMock()
+    cog.history_writer = MagicMock()
+    with patch('bot.cogs.music.get_track_loudness', return_value=None), \
+            patch('bot.cogs.music.get_audio_stream', AsyncMock(side_effect=lambda url: MagicMock(name=url))), \
+            patch('bot.cogs.music.get_song_info', AsyncMock(side_effect=lambda url: next(song for song in SONGS if song['url'] == url))):
+        yield cog
+
+@pytest.fixture
+def ctx():
+    ctx = MagicMock()
+    ctx.guild.id = 1234567890
+    ctx.send = AsyncMock()
+    return ctx
+
+def test_jobs_for_one_guild_never_interleave():
+    events = []
+
+    async def job(name):
+        events.append(f'{name} started')
+        await asyncio.sleep(0.01)
+        events.append(f'{name} finished')
+        return name
+
+    async def main():
+        player = GuildPlayer(1)
+        return await asyncio.gather(player.submit(job, 'a'), player.submit(job, 'b'), player.submit(job, 'c'))
+
+    assert asyncio.run(main()) == ['a', 'b', 'c']
+    assert events == ['a started', 'a finished', 'b started', 'b finished', 'c started', 'c finished']
+
+def test_jobs_for_different_guilds_overlap():
+    events = []
+
+    async def job(name):
+        events.append(f'{name} started')
+        await asyncio.sleep(0.01)
+        events.append(f'{name} finished')
+
+    async def main():
+        await asyncio.gather(GuildPlayer(1).submit(job, 'a'), GuildPlayer(2).submit(job, 'b'))
+
+    asyncio.run(main())
+    assert events[:2] == ['a started', 'b started']
+
+def test_submit_raises_job_errors():
+    async def job():
+        raise ValueError('Bad job')
+
+    async def main():
+        player = GuildPlayer(1)
+        with pytest.raises(ValueError):
+            await player.submit(job)
+        # The worker survives a failed job.
+        return await player.submit(asyncio.sleep, 0, 'done')
+
+    assert asyncio.run(main()) == 'done'
+
+def test_posted_jobs_run_in_order():
+    events = []
+
+    async def job(name):
+        events.append(name)
+
+    async def main():
+        player = GuildPlayer(1)
+        player.post(job, 'a')
+        player.post(job, 'b')
+        await player.submit(job, 'c')
+        assert not player.pending
+
+    asyncio.run(main())
+    assert events == ['a', 'b', 'c']
+
+@patch('utils.player_utils.loop_monitor')
+def test_player_jobs_are_attributed(mock_loop_monitor, cog, ctx):
+    async def main():
+        cog.get_player(ctx.guild.id).voice_client = FakeVoiceClient()
+        await cog.pause(ctx)
+
+    asyncio.run(main())
+    mock_loop_monitor.track_task.assert_called_once_with('MusicCog.pause')
+    mock_loop_monitor.untrack_task.assert_called_once()
+
+def test_concurrent_plays_start_one_song(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        await asyncio.gather(*(cog.play(ctx, song['url']) for song in SONGS))
+        return player
+
+    player = asyncio.run(main())
+    assert len(player.voice_client.played) == 1
+    assert player.current_song == SONGS[0]
+    assert player.queue == SONGS[1:]
+
+def test_skip_advances_queue_once(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        player.queue = list(SONGS)
+        await player.submit(cog.play_next, ctx, player)
+        await cog.skip(ctx)
+        await drain(player)
+        return player
+
+    player = asyncio.run(main())
+    assert len(player.voice_client.played) == 2
+    assert player.current_song == SONGS[1]
+    assert player.current_source is player.voice_client.source
+    assert player.queue == SONGS[2:]
+
+def test_skip_with_song_loop_moves_on(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        player.queue = list(SONGS)
+        player.song_loop = True
+        await player.submit(cog.play_next, ctx, player)
+        await cog.skip(ctx)
+        await drain(player)
+        return player
+
+    player = asyncio.run(main())
+    assert player.current_song == SONGS[1]
+    assert player.queue == SONGS[2:]
+
+def test_repeated_skips_never_double_advance(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        player.queue = list(SONGS)
+        await player.submit(cog.play_next, ctx, player)
+        # The second skip runs before the first one's `after` callback has started the next song.
+        await asyncio.gather(cog.skip(ctx), cog.skip(ctx))
+        await drain(player)
+        return player
+
+    player = asyncio.run(main())
+    assert len(player.voice_client.played) == 2
+    assert player.current_song == SONGS[1]
+    assert player.queue == SONGS[2:]
+
+def test_song_end_advances_queue(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        player.queue = list(SONGS[:2])
+        await player.submit(cog.play_next, ctx, player)
+        player.voice_client.stop()
+        await drain(player)
+        first_end = (player.current_song, list(player.queue))
+        player.voice_client.stop()
+        await drain(player)
+        return player, first_end
+
+    player, first_end = asyncio.run(main())
+    assert first_end == (SONGS[1], [])
+    assert player.current_song is None
+    assert player.current_source is None
+
+def test_stop_ignores_stale_after_callback(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        player.queue = list(SONGS[:2])
+        await player.submit(cog.play_next, ctx, player)
+        # The new song starts before the stopped song's `after` callback reaches the mailbox.
+        await asyncio.gather(cog.stop(ctx), cog.play(ctx, SONGS[2]['url']))
+        await drain(player)
+        return player
+
+    player = asyncio.run(main())
+    assert len(player.voice_client.played) == 2
+    assert player.current_song == SONGS[2]
+    assert player.current_source is player.voice_client.source
+    assert player.queue == []
+
+@patch('bot.cogs.music.get_broadcast')
+def test_broadcast_starts_only_idle_players(mock_get_broadcast, cog, ctx):
+    stream = MagicMock()
+    stream.subscribe.side_effect = lambda: MagicMock()
+    mock_get_broadcast.return_value = stream
+
+    async def main():
+        idle = cog.get_player(1)
+        idle.voice_client = FakeVoiceClient()
+        busy = cog.get_player(2)
+        busy.voice_client = FakeVoiceClient()
+        busy.queue = [SONGS[1]]
+        await busy.submit(cog.play_next, ctx, busy)
+        await cog.broadcast(ctx, SONGS[0]['url'])
+        return idle, busy
+
+    idle, busy = asyncio.run(main())
+    assert idle.current_song == SONGS[0]
+    assert idle.current_source is idle.voice_client.source
+    assert len(idle.voice_client.played) == 1
+    assert busy.current_song == SONGS[1]
+    assert len(busy.voice_client.played) == 1
+    assert ctx.send.call_args[0][0] == 'Broadcasting Song 0 to 1 voice channels.'
+    cog.history_writer.record.assert_any_call(1, SONGS[0])
+    assert cog.history_writer.record.call_count == 2
+
+@patch('bot.cogs.music.get_broadcast')
+def test_broadcast_end_plays_songs_queued_meanwhile(mock_get_broadcast, cog, ctx):
+    mock_get_broadcast.return_value = MagicMock()
+
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        player.voice_client = FakeVoiceClient()
+        await cog.broadcast(ctx, SONGS[0]['url'])
+        await cog.play(ctx, SONGS[1]['url'])
+        assert player.queue == [SONGS[1]]
+        player.voice_client.stop()
+        await drain(player)
+        return player
+
+    player = asyncio.run(main())
+    assert player.current_song == SONGS[1]
+    assert player.queue == []
+    assert len(player.voice_client.played) == 2
+
+def test_disconnected_player_is_reaped_after_grace_period(cog, ctx):
+    async def main():
+        player = cog.get_player(ctx.guild.id)
+        voice_client = player.voice_client = FakeVoiceClient()
+        player.queue = list(SONGS)
+        await player.submit(cog.play_next, ctx, player)
+        voice_client.connected = False
+        assert cog.idle_reason(player, 0) is None
+        player.idle_since['disconnected'] = -10 ** 6
+        await player.submit(cog.reap, ctx.guild.id, player, 'disconnected')
+        await drain(player)
+        return player, voice_client
+
+    player, voice_client = asyncio.run(main())
+    assert voice_client.source is None
+    assert player.voice_client is None
+    assert player.current_source is None
+    assert player.queue == []
+    assert ctx.guild.id not in cog.players